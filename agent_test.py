@@ -3,16 +3,42 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 from importlib import reload
 
+import benchmark
+import competition_agent
 import game_agent
 import isolation
+import opening_book
+import sample_players
+import tournament
+
+try:
+    import batch_eval
+    import selfplay
+    import tablebase
+except ImportError:  # NumPy is not installed
+    batch_eval = selfplay = tablebase = None
 
 basic_player_1 = "Player1"
 basic_player_2 = "Player2"
 
 
+class ForfeitPlayer:
+    """Player that never plays a legal move."""
+
+    def get_move(self, game, time_left):
+        return (-1, -1)
+
+
 class IsolationTest(unittest.TestCase):
     """Unit tests for isolation agents"""
 
@@ -43,6 +69,85 @@ class IsolationTest(unittest.TestCase):
         self.assertEqual(game_agent.centerness(self.game, self.p1), 1)
         self.assertEqual("{0:.3f}".format(game_agent.centerness(self.game, self.p2)), "0.354")
 
+    def test_knight_moves_skip_blocked_and_off_board_squares(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        for m in ((2, 3), (0, 5), (4, 4), (1, 1)):
+            self.game.apply_move(m)
+        self.assertEqual(sorted(self.game.get_legal_moves(self.p1)),
+                         [(2, 5), (3, 2), (3, 6), (5, 2), (5, 6), (6, 3), (6, 5)])
+        self.assertEqual(sorted(self.game.get_legal_moves(self.p2)),
+                         [(0, 3), (3, 0), (3, 2)])
+
+        # forecasting must not leak into the parent board
+        child = self.game.forecast_move((3, 2))
+        self.assertFalse(child.move_is_legal((3, 2)))
+        self.assertTrue(self.game.move_is_legal((3, 2)))
+
+    def test_hash_matches_for_transposed_move_orders(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        other = isolation.Board(self.p1, self.p2)
+        for m in ((0, 0), (6, 6), (1, 2), (4, 5), (3, 3)):
+            self.game.apply_move(m)
+        for m in ((1, 2), (6, 6), (0, 0), (4, 5), (3, 3)):
+            other.apply_move(m)
+        self.assertEqual(self.game.hash(), other.hash())
+        self.assertEqual(self.game.copy().hash(), self.game.hash())
+        self.assertNotEqual(self.game.forecast_move((5, 4)).hash(), self.game.hash())
+
+    def test_pop_move_restores_pushed_state(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        self.game.apply_move((2, 3))
+        self.game.apply_move((0, 5))
+        before = (self.game.hash(), self.game.to_string(), self.game.move_count)
+
+        self.game.push_move((4, 4))
+        self.game.push_move((2, 4))
+        self.assertEqual(self.game.get_player_location(self.p2), (2, 4))
+        self.game.pop_move()
+        self.game.pop_move()
+
+        self.assertEqual((self.game.hash(), self.game.to_string(), self.game.move_count), before)
+        self.assertTrue(self.p1 == self.game.active_player)
+        self.assertEqual(self.game.get_player_location(self.p1), (2, 3))
+        with self.game.moved((4, 4)) as child:
+            self.assertEqual(child.get_player_location(self.p1), (4, 4))
+        self.assertEqual(self.game.hash(), before[0])
+        self.assertRaises(RuntimeError, self.game.pop_move)
+
+    def test_neighbor_tables_are_shared_per_board_size(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        tables = isolation.board_tables(7, 7)
+        self.assertIs(isolation.Board(self.p1, self.p2).copy()._tables, tables)
+        self.assertIsNot(isolation.board_tables(9, 9), tables)
+        # corner square (0, 0) has index 0, square (1, 2) has index 1 + 2 * 7
+        self.assertEqual(sorted(tables.neighbor_moves[0]), [(1, 2), (2, 1)])
+        self.assertEqual(sorted(tables.neighbor_indices[0]), [2 + 1 * 7, 1 + 2 * 7])
+
+    def test_unshuffled_board_returns_canonical_move_order(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        board = isolation.Board(self.p1, self.p2, shuffle=False)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        board.apply_move((1, 2))
+        first = board.get_legal_moves(self.p2)
+        self.assertEqual(first, [(2, 1)])
+        moves = board.copy().get_legal_moves(self.p1)
+        # knight directions in order, skipping blocked and off-board squares
+        self.assertEqual(moves, [(0, 4), (2, 0), (2, 4), (3, 1)])
+        self.assertEqual([board.get_legal_moves(self.p1) for _ in range(5)], [moves] * 5)
+
+    def test_reach_count_floods_over_blank_squares(self):
+        self.setup_game(basic_player_1, basic_player_2)
+        self.assertEqual(self.game.reach_count(None, 3), 49)
+        self.game.apply_move((0, 0))
+        self.game.apply_move((6, 6))
+        self.assertEqual(self.game.reach_count((0, 0), 1), 2)
+        # (1, 2) and (2, 1), then 9 distinct blank squares one more jump away
+        self.assertEqual(self.game.reach_count((0, 0), 2), 2 + 9)
+        self.game.apply_move((1, 2))
+        self.game.apply_move((2, 1))
+        self.assertEqual(self.game.reach_count((0, 0), 3), 0)
+
     def test_player2_moves_after_player1(self):
         self.setup_game(basic_player_1, basic_player_2)
         self.game.apply_move((2, 3))
@@ -312,6 +417,452 @@ class IsolationTest(unittest.TestCase):
         result = self.p1.alphabeta(self.game, 2, alpha, beta)
         self.assertIn(result, ((5, 5), (7, 5)))
 
+    def test_transposition_table_replacement_schemes(self):
+        TT = game_agent.TranspositionTable
+        # keys 1 and 4 share a bucket in a table of size 3
+        deep = game_agent.TranspositionTable(3, "depth")
+        deep.store(1, 5, 1., TT.EXACT, (0, 0))
+        deep.store(4, 2, 2., TT.EXACT, (1, 1))
+        self.assertIsNotNone(deep.probe(1))
+        self.assertIsNone(deep.probe(4))
+
+        always = game_agent.TranspositionTable(3, "always")
+        always.store(1, 5, 1., TT.EXACT, (0, 0))
+        always.store(4, 2, 2., TT.EXACT, (1, 1))
+        self.assertIsNone(always.probe(1))
+        self.assertEqual(always.probe(4)[4], (1, 1))
+
+        two_tier = game_agent.TranspositionTable(3, "two_tier")
+        two_tier.store(1, 5, 1., TT.EXACT, (0, 0))
+        two_tier.store(4, 2, 2., TT.EXACT, (1, 1))
+        self.assertIsNotNone(two_tier.probe(1))
+        self.assertIsNotNone(two_tier.probe(4))
+        self.assertLessEqual(len(two_tier), 2 * two_tier.size)
+
+    def test_transposition_table_bounds_cut_only_outside_window(self):
+        TT = game_agent.TranspositionTable
+        table = game_agent.TranspositionTable(8)
+        table.store(3, 4, 5., TT.LOWER, (2, 2))
+        self.assertEqual(table.lookup(3, 4, 0., 4.), (5., (2, 2)))
+        self.assertEqual(table.lookup(3, 4, 0., 6.), (None, (2, 2)))
+        self.assertEqual(table.lookup(3, 5, 0., 4.), (None, (2, 2)))
+
+    def test_alphabeta_player_sizes_transposition_table(self):
+        player = game_agent.AlphaBetaPlayer(tt_size=128, tt_replacement="two_tier")
+        self.assertEqual(player.tt.size, 128)
+        self.assertIsNone(game_agent.AlphaBetaPlayer(tt_size=0).tt)
+        self.assertIsNone(game_agent.MinimaxPlayer().tt)
+
+    def test_evaluation_caches_evict_at_capacity(self):
+        for cache in (game_agent.LRUCache(2), game_agent.ClockCache(2)):
+            cache.put(1, 1.)
+            cache.put(2, 2.)
+            self.assertEqual(cache.get(1), 1.)
+            cache.put(3, 3.)
+            self.assertEqual(len(cache), 2)
+            # key 1 was used more recently than key 2
+            self.assertEqual(cache.get(1), 1.)
+            self.assertIsNone(cache.get(2))
+            self.assertEqual(cache.stats()["evictions"], 1)
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_game_scoped_cache_is_cleared_by_a_new_game(self):
+        player = game_agent.MinimaxPlayer(eval_scope="game")
+        opponent = sample_players.GreedyPlayer()
+
+        def play_from(opening):
+            game = isolation.Board(player, opponent)
+            for move in opening:
+                game.apply_move(move)
+            game.apply_move(player.get_move(game, lambda: 1000.))
+            game.apply_move(opponent.get_move(game, lambda: 1000.))
+            return game
+
+        game = play_from([(3, 3), (0, 0)])
+        self.assertGreater(len(player.eval_cache), 0)
+        size = len(player.eval_cache)
+        player.get_move(game, lambda: 1000.)
+        self.assertGreater(len(player.eval_cache), size)
+
+        # another opening at a higher move count
+        play_from([(2, 2), (4, 4), (0, 1), (6, 5)])
+        player.eval_cache.put("stale", 0.)
+        play_from([(1, 1), (5, 5), (0, 3), (6, 3), (2, 2), (4, 4)])
+        self.assertIsNone(player.eval_cache.get("stale"))
+
+    def test_custom_score_cache_is_per_player_perspective(self):
+        self.setup_game(game_agent.AlphaBetaPlayer(), game_agent.AlphaBetaPlayer())
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+        p1_score = game_agent.custom_score(self.game, self.p1)
+        p2_score = game_agent.custom_score(self.game, self.p2)
+        self.assertNotEqual(p1_score, p2_score)
+        self.assertEqual(len(self.p1.eval_cache), 1)
+        self.assertEqual(game_agent.custom_score(self.game, self.p1), p1_score)
+        self.assertEqual(self.p1.eval_cache.hits, 1)
+
+    def test_move_ordering_pv_then_killers_then_history(self):
+        ordering = game_agent.MoveOrdering()
+        ordering.record_cutoff((1, 1), 2, 3)
+        ordering.record_cutoff((4, 4), 1, 2)
+        ordering.record_cutoff((4, 4), 1, 2)
+        moves = [(0, 0), (4, 4), (1, 1), (2, 2), (3, 3)]
+        ordered = ordering.order(None, moves, 2, (3, 3))
+        self.assertEqual(ordered, [(3, 3), (1, 1), (4, 4), (0, 0), (2, 2)])
+        # the order does not depend on the order of generation
+        self.assertEqual(ordering.order(None, list(reversed(moves)), 2, (3, 3)), ordered)
+
+        ordering.new_move()
+        self.assertEqual(ordering.killers, {})
+        self.assertEqual(ordering.history, {(1, 1): 4, (4, 4): 4})
+
+    def test_aspiration_search_matches_full_window_score(self):
+        self.setup_game(game_agent.AlphaBetaPlayer(aspiration=0.5), game_agent.AlphaBetaPlayer(), 9, 9)
+        filling_moves = ((2, 3), (5, 3), (6, 3), (3, 4), (4, 4), (5, 4), (3, 5),
+                         (4, 6), (4, 5), (4, 3))
+        for m in filling_moves:
+            self.game.apply_move(m)
+
+        score = None
+        for depth in range(1, 4):
+            move, score = self.p1.aspiration_search(self.game, depth, score)
+            self.p1.update_pv(self.game, depth)
+        self.assertIn(move, self.game.get_legal_moves())
+        self.assertEqual(self.p1.pv[0], move)
+
+        self.p1.tt, self.p1.ordering, self.p1.root_scores = None, None, {}
+        self.assertEqual(self.p1.search_root(self.game, 3)[1], score)
+
+    def test_search_stats_record_each_move(self):
+        stats = game_agent.SearchStats()
+        self.setup_game(game_agent.AlphaBetaPlayer(stats=stats, time_manager=False),
+                        game_agent.MinimaxPlayer())
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+        start = timeit.default_timer()
+        move = self.p1.get_move(self.game, lambda: 50. - 1000 * (timeit.default_timer() - start))
+        self.assertIn(move, self.game.get_legal_moves())
+
+        record, = stats.moves
+        self.assertEqual(record["move"], move)
+        self.assertEqual(record["move_count"], 2)
+        self.assertLess(record["time_left"], self.p1.TIMER_THRESHOLD)
+        iterations = record["iterations"]
+        self.assertEqual([i["depth"] for i in iterations], list(range(1, len(iterations) + 1)))
+        self.assertFalse(iterations[-1]["completed"])
+        self.assertTrue(all(i["completed"] for i in iterations[:-1]))
+        self.assertEqual(record["depth"], len(iterations) - 1)
+
+        summary = stats.summary()
+        self.assertEqual(summary["moves"], 1)
+        self.assertEqual(summary["nodes"], sum(summary["depth_nodes"].values()))
+        self.assertGreater(summary["evaluations"], 0)
+        self.assertIsNone(self.p2.stats)
+
+    def test_time_manager_predicts_iteration_growth(self):
+        clock = iter([100., 99., 96., 87., 60.])
+        manager = game_agent.TimeManager(safety=2., min_threshold=1.)
+        manager.begin_move(lambda: next(clock), 4)
+        manager.iteration_done()
+        # one iteration: grow by the number of root moves
+        self.assertEqual(manager.predict_next(), 4.)
+        manager.iteration_done()
+        manager.iteration_done()
+        self.assertAlmostEqual(manager.predict_next(), 27.)
+        self.assertTrue(manager.can_finish_next(10.))
+        manager.iteration_done()
+        self.assertFalse(manager.can_finish_next(10.))
+
+        self.assertEqual(manager.threshold(10.), 10.)
+        manager.record_timeout(10., 9.)
+        manager.record_timeout(10., 7.)
+        self.assertEqual(manager.threshold(10.), 6.)
+        manager.record_timeout(10., 9.9)
+        self.assertEqual(manager.threshold(10.), 6.)
+
+    def test_deadline_is_checked_every_calibrated_number_of_nodes(self):
+        self.setup_game(game_agent.AlphaBetaPlayer(time_manager=False), game_agent.MinimaxPlayer())
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+        self.p1.begin_move(self.game, lambda: self.p1.TIMER_THRESHOLD - 1.)
+        with self.assertRaises(game_agent.SearchTimeout):
+            self.p1.alphabeta(self.game, 3)
+
+        start = timeit.default_timer()
+        time_left = lambda: 40. - 1000 * (timeit.default_timer() - start)
+        move = self.p1.get_move(self.game, time_left)
+        self.assertIn(move, self.game.get_legal_moves())
+        self.assertGreater(time_left(), 0.)
+        self.assertGreater(self.p1._check_interval, 1)
+
+    def test_direct_search_after_get_move_reads_time_left(self):
+        for player_class in (game_agent.MinimaxPlayer, game_agent.AlphaBetaPlayer):
+            self.setup_game(player_class(), sample_players.GreedyPlayer())
+            self.game.apply_move((3, 3))
+            self.game.apply_move((0, 0))
+            start = timeit.default_timer()
+            self.p1.get_move(self.game, lambda: 20. - 1000 * (timeit.default_timer() - start))
+            time.sleep(0.03)
+
+            # the deadline of the move has passed, but no longer applies
+            self.p1.time_left = lambda: 10000.
+            if player_class is game_agent.MinimaxPlayer:
+                move = self.p1.minimax(self.game, 2)
+            else:
+                move = self.p1.alphabeta(self.game, 2)
+            self.assertIn(move, self.game.get_legal_moves())
+
+    def test_pvs_matches_alphabeta_scores(self):
+        filling_moves = ((2, 3), (5, 3), (6, 3), (3, 4), (4, 4), (5, 4), (3, 5), (4, 6), (4, 5))
+        for player_class in (game_agent.AlphaBetaPlayer, game_agent.PVSPlayer):
+            # the searching player is player 2, to move after the filling moves
+            self.setup_game(sample_players.GreedyPlayer(), player_class(), 9, 9)
+            for m in filling_moves:
+                self.game.apply_move(m)
+            scores = [self.p2.search_root(self.game, depth)[1] for depth in range(1, 5)]
+            if player_class is game_agent.AlphaBetaPlayer:
+                expected = scores
+        for score, expected_score in zip(scores, expected):
+            self.assertAlmostEqual(score, expected_score)
+
+    def test_mcts_player_reuses_tree_between_moves(self):
+        self.setup_game(competition_agent.CustomPlayer(timeout=10.), sample_players.GreedyPlayer())
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+        def clock(start=200.):
+            # one millisecond passes at every reading
+            readings = iter(range(10 ** 6))
+            return lambda: start - next(readings)
+
+        move = self.p1.get_move(self.game, clock())
+        self.assertIn(move, self.game.get_legal_moves())
+        self.assertGreater(self.p1.iterations, 100)
+        self.game.apply_move(move)
+        self.game.apply_move(self.p2.get_move(self.game, clock()))
+
+        tree, node = self.p1._last[:2]
+        reused_visits = tree.visits[tree.child(node, self.game._locations[1])]
+        move = self.p1.get_move(self.game, clock())
+        self.assertIn(move, self.game.get_legal_moves())
+        tree = self.p1._last[0]
+        self.assertEqual(tree.visits[tree.root], reused_visits + self.p1.iterations)
+
+    def test_parallel_alphabeta_returns_legal_move_in_time(self):
+        self.setup_game(game_agent.AlphaBetaPlayer(workers=2), sample_players.GreedyPlayer())
+        self.addCleanup(self.p1.close)
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+        moves = self.game.get_legal_moves()
+        self.assertIn(self.p1.search_root(self.game, 3, moves=moves[1:2])[0], ((-1, -1), moves[1]))
+
+        start = timeit.default_timer()
+        time_left = lambda: 100. - 1000 * (timeit.default_timer() - start)
+        move = self.p1.get_move(self.game, time_left)
+        self.assertIn(move, moves)
+        self.assertGreater(time_left(), 0.)
+
+        # a task starting after its deadline returns at once, whatever the
+        # time spent queued
+        board = self.game.copy_with_players("player_1", "player_2")
+        self.assertEqual(game_agent._search_share(0, self.p1._worker_config, board, 0, moves,
+                                                  time.monotonic() - 1.), ([], False))
+
+    def test_tournament_totals_do_not_depend_on_workers(self):
+        cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")]
+        test_agents = [tournament.Agent(sample_players.GreedyPlayer(), "Greedy"),
+                       tournament.Agent(ForfeitPlayer(), "Forfeit")]
+        serial = tournament._play_matches(cpu_agents, test_agents, 2, seed=3)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = tournament._play_matches(cpu_agents, test_agents, 2, executor, seed=3)
+        self.assertEqual(parallel, serial)
+        wins, timeouts, forfeits = parallel
+        self.assertEqual(wins[test_agents[1].player], 0)
+        self.assertEqual((timeouts, forfeits), (0, 4))
+
+    def test_benchmark_report_round_trips_as_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "baseline.json")
+            self.assertEqual(benchmark.main(["--positions", "1", "--output", filename]), 0)
+            with open(filename) as f:
+                baseline = json.load(f)
+
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
+        name = "minimax/depth_1"
+        key, value = benchmark.main_metric(baseline["results"][name])
+        report = json.loads(json.dumps(baseline))
+        report["results"][name][key] = value * (1 - 2 * benchmark.TOLERANCE)
+        self.assertEqual(benchmark.compare(report, baseline), [name])
+
+    def test_opening_book_moves_follow_board_symmetries(self):
+        book = opening_book.build_book(plies=2, time_limit=5.)
+        # the first move and one reply per class of symmetric placements
+        self.assertEqual(len(book["moves"]), 1 + 10)
+        player = competition_agent.CustomPlayer(data=book)
+
+        def book_move(first_move):
+            game = isolation.Board(sample_players.GreedyPlayer(), player)
+            game.apply_move(first_move)
+            move = player.book.lookup(game)
+            self.assertIn(move, game.get_legal_moves())
+            return move
+
+        # reflect the first move across the anti-diagonal; the moves are off
+        # every axis of symmetry so that each position has a single image
+        for row, col in ((0, 1), (1, 2), (2, 0), (4, 1)):
+            reply = book_move((row, col))
+            self.assertEqual(book_move((6 - col, 6 - row)), (6 - reply[1], 6 - reply[0]))
+
+    def test_endgame_solver_plays_longest_path_of_partitioned_board(self):
+        def brute_force(blank, loc):
+            jumps = [(loc[0] + dr, loc[1] + dc) for dr, dc in isolation.isolation.DIRECTIONS]
+            return max([1 + brute_force(blank - {m}, m) for m in jumps if m in blank] + [0])
+
+        rng = random.Random(4)
+        tables = isolation.board_tables(7, 7)
+        solved = 0
+        while solved < 5:
+            player = game_agent.AlphaBetaPlayer()
+            board = isolation.Board(player, sample_players.RandomPlayer(), shuffle=False)
+            regions = None
+            while regions is None and board.get_legal_moves():
+                board.apply_move(rng.choice(board.get_legal_moves()))
+                regions = game_agent.partition(board)
+            # keep regions small enough for the brute force
+            if (regions is None or board.active_player is not player or
+                    not 4 <= bin(regions[1]).count("1") <= 14):
+                continue
+            solved += 1
+
+            idx, region = regions[:2]
+            blank = {(i % 7, i // 7) for i in range(49) if region >> i & 1}
+            location = board.get_player_location(player)
+            self.assertEqual(game_agent.longest_path(tables, idx, region, dict()),
+                             brute_force(blank, location))
+
+            move = player.get_move(board, lambda: 150.)
+            self.assertEqual(brute_force(blank - {move}, move) + 1,
+                             brute_force(blank, location))
+
+    def test_symmetric_positions_share_keys_and_table_entries(self):
+        moves = [(1, 2), (3, 3), (3, 4)]
+        boards = []
+        for sym in range(8):
+            board = isolation.Board(basic_player_1, basic_player_2)
+            for move in moves:
+                board.apply_move(board.transform_move(move, sym))
+            boards.append(board)
+        keys = set(board.canonical_hash()[0] for board in boards)
+        self.assertEqual(keys, {min(board.hash() for board in boards)})
+        for board in boards:
+            key, sym = board.canonical_hash()
+            for move in board.get_blank_spaces():
+                self.assertEqual(board.transform_move(board.transform_move(move, sym), sym,
+                                                      inverse=True), move)
+
+        # searching an image of a position adds no transposition table entry
+        player = game_agent.AlphaBetaPlayer()
+        board = isolation.Board(player, basic_player_2)
+        board.apply_move((1, 2))
+        image = isolation.Board(player, basic_player_2)
+        image.apply_move(image.transform_move((1, 2), 5))
+        player.time_left = lambda: 1000.
+        player.alphabeta(board, 2)
+        entries = len(player.tt)
+        move = player.alphabeta(image, 2)
+        self.assertEqual(len(player.tt), entries)
+        self.assertIn(move, image.get_legal_moves())
+
+    def test_board_copy_shares_tables_but_not_state(self):
+        board = isolation.Board(basic_player_1, basic_player_2)
+        board.apply_move((2, 3))
+        board.apply_move((0, 5))
+        clone = board.copy()
+        self.assertFalse(hasattr(clone, "__dict__"))
+        self.assertIs(clone._tables, board._tables)
+        self.assertEqual((clone.hash(), clone.to_string()), (board.hash(), board.to_string()))
+
+        with clone.moved((4, 4)):
+            self.assertEqual(board.get_player_location(basic_player_1), (2, 3))
+            self.assertEqual(clone.get_player_location(basic_player_1), (4, 4))
+        clone.apply_move((0, 1))
+        self.assertEqual(board.move_count, 2)
+        self.assertTrue(board.move_is_legal((0, 1)))
+
+    @unittest.skipIf(batch_eval is None, "NumPy is not installed")
+    def test_batch_scores_match_scalar_scores(self):
+        self.setup_game(game_agent.AlphaBetaPlayer(eval_cache=game_agent.LRUCache(0)),
+                        game_agent.AlphaBetaPlayer(), 9, 9)
+        for m in ((2, 3), (5, 3), (6, 3), (3, 4), (4, 4), (5, 4), (3, 5), (4, 6), (4, 5), (4, 3)):
+            self.game.apply_move(m)
+        moves = self.game.get_legal_moves()
+        pairs = ((sample_players.improved_score, batch_eval.batch_improved_score),
+                 (sample_players.open_move_score, batch_eval.batch_open_move_score),
+                 (sample_players.center_score, batch_eval.batch_center_score),
+                 (game_agent.custom_score_3, batch_eval.batch_custom_score_3),
+                 (game_agent.custom_score, batch_eval.batch_custom_score))
+        for player in (self.p1, self.p2):
+            for score_fn, batch_fn in pairs:
+                expected = [score_fn(self.game.forecast_move(m), player) for m in moves]
+                for value, expected_value in zip(batch_fn(self.game, moves, player), expected):
+                    self.assertAlmostEqual(value, expected_value)
+
+    @unittest.skipIf(tablebase is None, "NumPy is not installed")
+    def test_tablebase_values_match_exhaustive_search(self):
+        def solve(game):
+            # (win, plies) for the player to move, with the tablebase's
+            # preference for fast wins and slow losses
+            results = [solve(game.forecast_move(m)) for m in game.get_legal_moves()]
+            if not results:
+                return False, 0
+            win, plies = max(results, key=lambda r: (not r[0], -r[1] if not r[0] else r[1]))
+            return not win, plies + 1
+
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "tablebase.bin")
+            self.assertEqual(tablebase.build(filename, 4, 4, 5), 5)
+            table = tablebase.Tablebase(filename)
+            rng = random.Random(0)
+            probed = 0
+            for _ in range(50):
+                player = game_agent.AlphaBetaPlayer(tablebase=table)
+                game = isolation.Board(player, sample_players.RandomPlayer(), 4, 4, shuffle=False)
+                while game.get_legal_moves():
+                    value = table.probe(game)
+                    if value is not None:
+                        probed += 1
+                        self.assertEqual(value, solve(game))
+                        if game.active_player is player:
+                            move = player.get_move(game, lambda: 150.)
+                            self.assertEqual(solve(game.forecast_move(move)),
+                                             (not value[0], value[1] - 1))
+                    game.apply_move(rng.choice(game.get_legal_moves()))
+            table.close()
+            self.assertGreater(probed, 0)
+
+    @unittest.skipIf(selfplay is None, "NumPy is not installed")
+    def test_batched_self_play_replays_on_board(self):
+        policies = ((selfplay.greedy_policy, sample_players.open_move_score),
+                    (selfplay.improved_policy, sample_players.improved_score))
+        for policy, score_fn in policies:
+            result = selfplay.simulate(50, policy, selfplay.random_policy, seed=1)
+            for game in range(50):
+                board = isolation.Board(basic_player_1, basic_player_2)
+                for ply, move in enumerate(selfplay.game_moves(result, game)):
+                    self.assertIn(move, board.get_legal_moves())
+                    if ply % 2 == 0:
+                        # the greedy player's move has the best score
+                        best = max(score_fn(board.forecast_move(m), basic_player_1)
+                                   for m in board.get_legal_moves())
+                        self.assertEqual(score_fn(board.forecast_move(move), basic_player_1), best)
+                    board.apply_move(move)
+                self.assertFalse(board.get_legal_moves())
+                winner = basic_player_2 if result.winners[game] else basic_player_1
+                self.assertTrue(board.is_winner(winner))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
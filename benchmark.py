@@ -0,0 +1,341 @@
+"""Measure the speed of the game engine, the heuristics and the search agents
+on a fixed corpus of seeded positions.
+
+Every run plays the same positions on 7x7 and 9x9 boards, so the numbers of
+two runs can be compared directly:
+
+    python benchmark.py --output baseline.json
+    ... change something ...
+    python benchmark.py --baseline baseline.json
+
+Engine and heuristic benchmarks report calls per second, search benchmarks
+report nodes (min_value / max_value calls) per second, and the time-budget
+searches also report the mean depth reached per move. Each benchmark is run
+once more under `tracemalloc` to report its peak allocated memory, and the
+board copy benchmark reports the memory held by each copy.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+
+from isolation import Board
+import game_agent
+import sample_players
+
+BOARD_SIZES = [(7, 7), (9, 9)]
+POSITIONS_PER_SIZE = 20
+CORPUS_SEED = 2017
+
+SCORE_FUNCTIONS = [
+    ("null_score", sample_players.null_score),
+    ("open_move_score", sample_players.open_move_score),
+    ("improved_score", sample_players.improved_score),
+    ("center_score", sample_players.center_score),
+    ("custom_score", game_agent.custom_score),
+    ("custom_score_2", game_agent.custom_score_2),
+    ("custom_score_3", game_agent.custom_score_3),
+]
+
+MINIMAX_DEPTHS = [1, 2, 3]
+ALPHABETA_DEPTHS = [2, 4]
+TIME_BUDGETS = [150]
+
+# Relative slowdown of the main metric reported as a regression
+TOLERANCE = 0.1
+
+
+def build_corpus(seed=CORPUS_SEED, positions_per_size=POSITIONS_PER_SIZE):
+    """Return the corpus as a list of (width, height, moves) positions, each
+    reached by random legal moves from an empty board. Only positions where
+    both players still have a move are kept.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for width, height in BOARD_SIZES:
+        while sum(1 for w, h, _ in corpus if (w, h) == (width, height)) < positions_per_size:
+            board = Board("1", "2", width, height, shuffle=False)
+            moves = []
+            for _ in range(rng.randint(2, width * height // 3)):
+                legal_moves = board.get_legal_moves()
+                if not legal_moves:
+                    break
+                move = rng.choice(legal_moves)
+                board.apply_move(move)
+                moves.append(move)
+            if board.get_legal_moves() and board.get_legal_moves(board.inactive_player):
+                corpus.append((width, height, moves))
+    return corpus
+
+
+def make_board(position, player_1="1", player_2="2"):
+    """Set up a corpus position for the given players."""
+    width, height, moves = position
+    board = Board(player_1, player_2, width, height, shuffle=False)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+def make_search_board(position, player):
+    """Set up a corpus position with `player` holding initiative."""
+    opponent = sample_players.RandomPlayer()
+    if len(position[2]) % 2:
+        return make_board(position, opponent, player)
+    return make_board(position, player, opponent)
+
+
+def count_nodes(player):
+    """Count the min_value / max_value calls of a player; return a one-item
+    list holding the count.
+    """
+    counter = [0]
+    for name in ("min_value", "max_value"):
+        method = getattr(player, name)
+
+        def counted(*args, _method=method, **kwargs):
+            counter[0] += 1
+            return _method(*args, **kwargs)
+
+        setattr(player, name, counted)
+    return counter
+
+
+def peak_memory(fn):
+    """Run fn under tracemalloc and return its peak allocation in bytes."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def board_footprint(boards, copies=100):
+    """Return the memory held by a board copy, in bytes, averaged over
+    `copies` copies of each board kept alive at once.
+    """
+    tracemalloc.start()
+    try:
+        kept = [board.copy() for board in boards for _ in range(copies)]
+        return tracemalloc.get_traced_memory()[0] / len(kept)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_calls(fn, repeat=3):
+    """Time fn, which makes `fn()` calls and returns their number, and
+    report the best calls per second of `repeat` runs.
+    """
+    best = None
+    calls = 0
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        calls = fn()
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"calls": calls, "seconds": best, "calls_per_sec": calls / best,
+            "alloc_peak_bytes": peak_memory(fn)}
+
+
+def engine_benchmarks(corpus):
+    boards = [make_board(position) for position in corpus]
+
+    def legal_moves():
+        for board in boards:
+            for _ in range(100):
+                board.get_legal_moves()
+        return 100 * len(boards)
+
+    def forecast():
+        calls = 0
+        for board in boards:
+            for move in board.get_legal_moves():
+                for _ in range(20):
+                    board.forecast_move(move)
+                calls += 20
+        return calls
+
+    def copies():
+        for board in boards:
+            for _ in range(100):
+                board.copy()
+        return 100 * len(boards)
+
+    copy_result = bench_calls(copies)
+    copy_result["bytes_per_board"] = board_footprint(boards)
+    return {"get_legal_moves": bench_calls(legal_moves),
+            "forecast_move": bench_calls(forecast),
+            "copy": copy_result}
+
+
+def score_benchmarks(corpus):
+    results = dict()
+    player_1 = game_agent.IsolationPlayer(eval_cache=game_agent.LRUCache(0))
+    player_2 = game_agent.IsolationPlayer(eval_cache=game_agent.LRUCache(0))
+    boards = [make_board(position, player_1, player_2) for position in corpus]
+    for name, score_fn in SCORE_FUNCTIONS:
+
+        def scores(score_fn=score_fn):
+            for board in boards:
+                for _ in range(20):
+                    score_fn(board, player_1)
+            return 20 * len(boards)
+
+        results["score/" + name] = bench_calls(scores)
+    return results
+
+
+def search_benchmark(corpus, make_player, search):
+    """Run `search(player, board)` on every position with a fresh player and
+    report nodes per second; search returns the depth reached or None.
+    """
+    def run(stats):
+        for position in corpus:
+            player = make_player()
+            counter = count_nodes(player)
+            board = make_search_board(position, player)
+            start = timeit.default_timer()
+            depth = search(player, board)
+            stats["seconds"] += timeit.default_timer() - start
+            stats["nodes"] += counter[0]
+            if depth is not None:
+                stats["depths"].append(depth)
+
+    stats = {"nodes": 0, "seconds": 0., "depths": []}
+    run(stats)
+    result = {"nodes": stats["nodes"], "seconds": stats["seconds"],
+              "nodes_per_sec": stats["nodes"] / stats["seconds"] if stats["seconds"] else 0.}
+    if stats["depths"]:
+        result["mean_depth"] = sum(stats["depths"]) / len(stats["depths"])
+    result["alloc_peak_bytes"] = peak_memory(lambda: run({"nodes": 0, "seconds": 0., "depths": []}))
+    return result
+
+
+def timed_search(player, board, time_limit):
+    """Call get_move() with a time budget; return the deepest completed
+    iteration.
+    """
+    depths = [0]
+    aspiration_search = player.aspiration_search
+
+    def tracked(game, depth, *args, **kwargs):
+        result = aspiration_search(game, depth, *args, **kwargs)
+        depths[0] = depth
+        return result
+
+    player.aspiration_search = tracked
+    move_start = 1000 * timeit.default_timer()
+    player.get_move(board, lambda: time_limit - (1000 * timeit.default_timer() - move_start))
+    return depths[0]
+
+
+def fixed_depth_search(method, depth):
+    """Return a search calling the player's `method` to a fixed depth."""
+    def search(player, board):
+        getattr(player, method)(board, depth)
+    return search
+
+
+def search_benchmarks(corpus):
+    results = dict()
+    score_fn = sample_players.improved_score
+    for depth in MINIMAX_DEPTHS:
+        results["minimax/depth_{}".format(depth)] = search_benchmark(
+            corpus, lambda: game_agent.MinimaxPlayer(score_fn=score_fn),
+            fixed_depth_search("minimax", depth))
+    for depth in ALPHABETA_DEPTHS:
+        results["alphabeta/depth_{}".format(depth)] = search_benchmark(
+            corpus, lambda: game_agent.AlphaBetaPlayer(score_fn=score_fn),
+            fixed_depth_search("alphabeta", depth))
+    for time_limit in TIME_BUDGETS:
+        for name, score_fn in (("improved_score", sample_players.improved_score),
+                               ("custom_score", game_agent.custom_score)):
+            results["alphabeta/{}ms/{}".format(time_limit, name)] = search_benchmark(
+                corpus, lambda score_fn=score_fn: game_agent.AlphaBetaPlayer(score_fn=score_fn),
+                lambda player, board, time_limit=time_limit: timed_search(player, board, time_limit))
+    return results
+
+
+def run_benchmarks(positions_per_size=POSITIONS_PER_SIZE):
+    corpus = build_corpus(positions_per_size=positions_per_size)
+    results = dict()
+    results.update(engine_benchmarks(corpus))
+    results.update(score_benchmarks(corpus))
+    results.update(search_benchmarks(corpus))
+    return {"meta": {"python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "positions": len(corpus),
+                     "corpus_seed": CORPUS_SEED},
+            "results": results}
+
+
+def main_metric(result):
+    """Return the name and value of the throughput metric of a result."""
+    key = "nodes_per_sec" if "nodes_per_sec" in result else "calls_per_sec"
+    return key, result[key]
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Print the throughput of each benchmark against the baseline and
+    return the names of the benchmarks that regressed by more than
+    `tolerance`.
+    """
+    regressions = []
+    print("{:<36}{:>14}{:>14}{:>9}".format("Benchmark", "Baseline", "Current", "Ratio"))
+    for name, result in sorted(report["results"].items()):
+        if name not in baseline["results"]:
+            continue
+        key, value = main_metric(result)
+        _, base_value = main_metric(baseline["results"][name])
+        ratio = value / base_value if base_value else float("inf")
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  <-- slower"
+        print("{:<36}{:>14.1f}{:>14.1f}{:>9.2f}{}".format(name, base_value, value, ratio, flag))
+    return regressions
+
+
+def print_report(report):
+    print("{:<36}{:>14}{:>12}{:>14}".format("Benchmark", "Throughput", "Depth", "Peak KiB"))
+    for name, result in sorted(report["results"].items()):
+        key, value = main_metric(result)
+        depth = "{:.2f}".format(result["mean_depth"]) if "mean_depth" in result else "-"
+        print("{:<36}{:>14.1f}{:>12}{:>14.1f}".format(
+            name, value, depth, result["alloc_peak_bytes"] / 1024.))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Isolation engine and agents.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument("--positions", type=int, default=POSITIONS_PER_SIZE,
+                        help="number of positions per board size")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.positions)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n{} benchmark(s) slower than the baseline".format(len(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,32 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import json
+import math
 import random
+from array import array
+
+# Exploration constant of the UCT selection rule
+UCT_EXPLORATION = math.sqrt(2)
+
+# Number of tree nodes above which a search starts from a fresh tree instead
+# of reusing the tree of the previous move
+MAX_TREE_NODES = 2 ** 20
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+# Knight neighbors of every square, keyed by (width, height); see
+# `knight_neighbors()`
+_NEIGHBORS = dict()
+
+# Square permutations of the board symmetries, keyed by (width, height); see
+# `symmetries()`
+_SYMMETRIES = dict()
+
+# Inverse permutations of `_SYMMETRIES`, keyed by (width, height); see
+# `inverse_symmetries()`
+_INVERSE_SYMMETRIES = dict()
 
 
 class SearchTimeout(Exception):
@@ -36,6 +61,351 @@ def custom_score(game, player):
     raise NotImplementedError
 
 
+def knight_neighbors(width, height):
+    """Return the square indices a knight can reach from each square index of
+    a board, with squares indexed column-major (`idx = row + col * height`).
+    """
+    key = (width, height)
+    neighbors = _NEIGHBORS.get(key)
+    if neighbors is None:
+        neighbors = [[r + dr + (c + dc) * height for dr, dc in DIRECTIONS
+                      if 0 <= r + dr < height and 0 <= c + dc < width]
+                     for r, c in ((idx % height, idx // height) for idx in range(width * height))]
+        _NEIGHBORS[key] = neighbors
+    return neighbors
+
+
+def symmetries(width, height):
+    """Return the symmetries of a board as permutations of the square
+    indices: `perm[idx]` is the square that `idx` is mapped to. The
+    identity comes first. A square board has the eight rotations and
+    reflections, a rectangular one the four that keep its shape; knight
+    moves are preserved by all of them.
+    """
+    key = (width, height)
+    perms = _SYMMETRIES.get(key)
+    if perms is None:
+        h, w = height - 1, width - 1
+        transforms = [lambda r, c: (r, c), lambda r, c: (h - r, w - c),
+                      lambda r, c: (h - r, c), lambda r, c: (r, w - c)]
+        if width == height:
+            transforms += [lambda r, c: (c, r), lambda r, c: (w - c, h - r),
+                           lambda r, c: (c, h - r), lambda r, c: (w - c, r)]
+        perms = []
+        for transform in transforms:
+            perm = []
+            for idx in range(width * height):
+                r, c = transform(idx % height, idx // height)
+                perm.append(r + c * height)
+            perms.append(perm)
+        _SYMMETRIES[key] = perms
+    return perms
+
+
+def inverse_symmetries(width, height):
+    """Return the inverses of the permutations of `symmetries()`, in the
+    same order: `inverse[perm[idx]] == idx`.
+    """
+    key = (width, height)
+    inverses = _INVERSE_SYMMETRIES.get(key)
+    if inverses is None:
+        inverses = []
+        for perm in symmetries(width, height):
+            inverse = [0] * len(perm)
+            for idx, image in enumerate(perm):
+                inverse[image] = idx
+            inverses.append(inverse)
+        _INVERSE_SYMMETRIES[key] = inverses
+    return inverses
+
+
+def bitboard(game):
+    """Read a game through the public Board API.
+
+    Returns
+    -------
+    (int, list<int or None>, int)
+        The bitmask of the occupied squares, the square index of player 1
+        and player 2 (None while not placed) and the slot of the player to
+        move (0 for player 1)
+    """
+    height = game.height
+    blocked = (1 << (game.width * height)) - 1
+    for r, c in game.get_blank_spaces():
+        blocked ^= 1 << (r + c * height)
+    players = (game.active_player, game.inactive_player)
+    slot = game.move_count % 2
+    if slot:
+        players = players[::-1]
+    locations = []
+    for player in players:
+        loc = game.get_player_location(player)
+        locations.append(None if loc is None else loc[0] + loc[1] * height)
+    return blocked, locations, slot
+
+
+def canonical_key(width, height, blocked, locations):
+    """Return the key of a position shared by all its symmetric images, and
+    the index in `symmetries()` of the permutation mapping the position to
+    the image the key describes.
+
+    The key is the smallest (blocked squares, player 1 square, player 2
+    square) triple over the images, written as a string. The player to
+    move is implied by the number of moves played.
+    """
+    squares = [idx for idx in range(width * height) if blocked >> idx & 1]
+    best, best_sym = None, 0
+    for sym, perm in enumerate(symmetries(width, height)):
+        image = (sum(1 << perm[idx] for idx in squares),
+                 -1 if locations[0] is None else perm[locations[0]],
+                 -1 if locations[1] is None else perm[locations[1]])
+        if best is None or image < best:
+            best, best_sym = image, sym
+    return "{:x}:{}:{}".format(*best), best_sym
+
+
+class OpeningBook:
+    """Best moves of the first plies of a game, keyed by `canonical_key()`,
+    as built by `opening_book.py`.
+
+    The book is a JSON object {"width": int, "height": int, "plies": int,
+    "moves": {key: [row, col]}}, where each move is given for the image
+    the key describes and is mapped back to the actual position on lookup.
+
+    Parameters
+    ----------
+    data : dict
+        The parsed book.
+    """
+
+    def __init__(self, data):
+        self.width = data["width"]
+        self.height = data["height"]
+        self.plies = data.get("plies")
+        self.moves = {key: tuple(move) for key, move in data["moves"].items()}
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def lookup(self, game):
+        """Return the book move for the game, or None if it is not in the
+        book.
+        """
+        if (game.width, game.height) != (self.width, self.height):
+            return None
+        if self.plies is not None and game.move_count >= self.plies:
+            return None
+        blocked, locations, _ = bitboard(game)
+        key, sym = canonical_key(self.width, self.height, blocked, locations)
+        move = self.moves.get(key)
+        if move is None:
+            return None
+        idx = inverse_symmetries(self.width, self.height)[sym][move[0] + move[1] * self.height]
+        return (idx % self.height, idx // self.height)
+
+
+def rollout(neighbors, blocked, locations, slot, size):
+    """Play random moves from a position until a player is stuck.
+
+    Parameters
+    ----------
+    neighbors : list<list<int>>
+        Knight neighbors of each square, see `knight_neighbors()`
+
+    blocked : int
+        Bitmask of the occupied squares
+
+    locations : list<int or None>
+        Square index of each player, None while not placed
+
+    slot : int
+        Index in `locations` of the player to move
+
+    size : int
+        Number of squares of the board
+
+    Returns
+    -------
+    int
+        The slot of the winning player
+    """
+    loc_0, loc_1 = locations
+    rand = random.random
+    while True:
+        loc = loc_1 if slot else loc_0
+        if loc is None:
+            moves = [idx for idx in range(size) if not blocked >> idx & 1]
+        else:
+            moves = [idx for idx in neighbors[loc] if not blocked >> idx & 1]
+        if not moves:
+            return slot ^ 1
+        idx = moves[int(rand() * len(moves))]
+        blocked |= 1 << idx
+        if slot:
+            loc_1 = idx
+        else:
+            loc_0 = idx
+        slot ^= 1
+
+
+class MCTSTree:
+    """Monte Carlo search tree stored in flat arrays indexed by node number.
+
+    The children of a node are numbered consecutively from
+    `first_child[node]`; `num_children[node]` is -1 until the node is
+    expanded. `wins[node]` counts the playouts through the node won by the
+    player who made `move[node]`. Nodes do not store their positions: the
+    search replays the moves from the root on a bitboard (an int of
+    occupied squares and the two player locations) instead.
+
+    Parameters
+    ----------
+    width, height : int
+        Dimensions of the board
+
+    blocked : int
+        Bitmask of the occupied squares at the root
+
+    locations : list<int or None>
+        Square index of player 1 and player 2 at the root
+
+    slot : int
+        0 if player 1 is to move at the root, 1 for player 2
+
+    exploration : float (optional)
+        Exploration constant of the UCT rule
+    """
+
+    def __init__(self, width, height, blocked, locations, slot, exploration=UCT_EXPLORATION):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.neighbors = knight_neighbors(width, height)
+        self.exploration = exploration
+        self.move = array("i")
+        self.first_child = array("i")
+        self.num_children = array("i")
+        self.visits = array("i")
+        self.wins = array("i")
+        self.root = self._add_node(-1)
+        self.set_root(self.root, blocked, locations, slot)
+
+    def __len__(self):
+        return len(self.move)
+
+    def _add_node(self, move):
+        self.move.append(move)
+        self.first_child.append(0)
+        self.num_children.append(-1)
+        self.visits.append(0)
+        self.wins.append(0)
+        return len(self.move) - 1
+
+    def set_root(self, node, blocked, locations, slot):
+        """Search from `node`, whose position is given, from now on."""
+        self.root = node
+        self.root_blocked = blocked
+        self.root_locations = list(locations)
+        self.root_slot = slot
+
+    def child(self, node, move):
+        """Return the child of `node` reached by the square index `move`, or
+        None if the node is not expanded.
+        """
+        start = self.first_child[node]
+        for child in range(start, start + max(self.num_children[node], 0)):
+            if self.move[child] == move:
+                return child
+        return None
+
+    def _expand(self, node, blocked, loc):
+        if loc is None:
+            moves = [idx for idx in range(self.size) if not blocked >> idx & 1]
+        else:
+            moves = [idx for idx in self.neighbors[loc] if not blocked >> idx & 1]
+        random.shuffle(moves)
+        self.first_child[node] = len(self.move)
+        self.num_children[node] = len(moves)
+        for idx in moves:
+            self._add_node(idx)
+
+    def _select(self, node):
+        """Return the child of an expanded node with the best UCT value;
+        unvisited children come first.
+        """
+        visits, wins = self.visits, self.wins
+        start = self.first_child[node]
+        log_visits = math.log(visits[node])
+        exploration = self.exploration
+        best, best_value = start, -1.
+        for child in range(start, start + self.num_children[node]):
+            n = visits[child]
+            if n == 0:
+                return child
+            value = wins[child] / n + exploration * math.sqrt(log_visits / n)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def iterate(self):
+        """Run one selection, expansion, playout and backpropagation."""
+        blocked = self.root_blocked
+        locations = list(self.root_locations)
+        slot = self.root_slot
+        node = self.root
+        path = [node]
+
+        # selection: descend through expanded nodes with moves left
+        while self.num_children[node] > 0 and self.visits[node] > 0:
+            node = self._select(node)
+            idx = self.move[node]
+            blocked |= 1 << idx
+            locations[slot] = idx
+            slot ^= 1
+            path.append(node)
+
+        # expansion of a leaf that was visited once already
+        if self.num_children[node] == -1 and (self.visits[node] > 0 or node == self.root):
+            self._expand(node, blocked, locations[slot])
+            if self.num_children[node] > 0:
+                node = self.first_child[node]
+                idx = self.move[node]
+                blocked |= 1 << idx
+                locations[slot] = idx
+                slot ^= 1
+                path.append(node)
+
+        if self.num_children[node] == 0:
+            winner = slot ^ 1
+        else:
+            winner = rollout(self.neighbors, blocked, locations, slot, self.size)
+
+        # the root was reached by a move of the player not to move there
+        mover = self.root_slot ^ 1
+        visits, wins = self.visits, self.wins
+        for node in path:
+            visits[node] += 1
+            if mover == winner:
+                wins[node] += 1
+            mover ^= 1
+
+    def best_move(self):
+        """Return the most visited child of the root and its square index,
+        or (None, None) if the root has no moves.
+        """
+        start = self.first_child[self.root]
+        children = range(start, start + max(self.num_children[self.root], 0))
+        if not children:
+            return None, None
+        node = max(children, key=self.visits.__getitem__)
+        return node, self.move[node]
+
+
 class CustomPlayer:
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
@@ -49,22 +419,48 @@ class CustomPlayer:
         COMPETITION.  IT IS NOT REQUIRED FOR THE ISOLATION PROJECT REVIEW.
     **************************************************************************
 
+    The player plays the moves of its opening book while the game is in
+    it, and otherwise searches with Monte Carlo Tree Search: UCT selection,
+    random playouts on a bitboard, and an anytime stop when the time left
+    (less the cost of the slowest iteration so far) reaches the threshold.
+    The subtree of the position after its move and the opponent's reply is
+    kept for the next move of the same game.
+
     Parameters
     ----------
-    data : string
-        The name of the search method to use in get_move().
+    data : dict or string (optional)
+        The opening book built by `opening_book.py`, either as its parsed
+        JSON object or as the name of its file; None plays without a book.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted.  Note that
         the PvP competition uses more accurate timers that are not cross-
         platform compatible, so a limit of 1ms (vs 10ms for the other classes)
         is generally sufficient.
+
+    exploration : float (optional)
+        Exploration constant of the UCT rule.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., exploration=UCT_EXPLORATION):
+        if isinstance(data, str):
+            data = OpeningBook.load(data)
+        elif data is not None:
+            data = OpeningBook(data)
+        self.book = data
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.exploration = exploration
+        self.iterations = 0
+        # (tree, node, blocked, locations, move count) after the last move
+        self._last = None
+
+    def __getstate__(self):
+        # worker processes start from a fresh tree
+        state = self.__dict__.copy()
+        state["_last"] = None
+        return state
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +489,63 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            self._last = None
+            return (-1, -1)
+
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move in legal_moves:
+                self._last = None
+                return move
+
+        blocked, locations, slot = bitboard(game)
+        tree = self.reuse_tree(game, blocked, locations)
+        if tree is None:
+            tree = MCTSTree(game.width, game.height, blocked, locations, slot, self.exploration)
+
+        self.iterations = 0
+        slowest = 0.
+        remaining = time_left()
+        while remaining - slowest > self.TIMER_THRESHOLD:
+            tree.iterate()
+            self.iterations += 1
+            now = time_left()
+            slowest = max(slowest, remaining - now)
+            remaining = now
+
+        node, idx = tree.best_move()
+        if node is None:
+            self._last = None
+            return legal_moves[0]
+
+        locations[slot] = idx
+        self._last = (tree, node, blocked | 1 << idx, locations, game.move_count + 1)
+        return (idx % game.height, idx // game.height)
+
+    def reuse_tree(self, game, blocked, locations):
+        """Return the tree of the previous move re-rooted at the current
+        position, or None if the position does not follow from it.
+        """
+        last, self._last = self._last, None
+        if last is None:
+            return None
+        tree, node, last_blocked, last_locations, move_count = last
+        if (game.move_count != move_count + 1 or len(tree) > MAX_TREE_NODES or
+                (tree.width, tree.height) != (game.width, game.height)):
+            return None
+
+        # the opponent's reply is the only square occupied since our move
+        slot = move_count % 2
+        reply = locations[slot]
+        if (reply is None or blocked != last_blocked | 1 << reply or
+                locations[slot ^ 1] != last_locations[slot ^ 1]):
+            return None
+        child = tree.child(node, reply)
+        if child is None:
+            return None
+        tree.set_root(child, blocked, locations, slot ^ 1)
+        return tree
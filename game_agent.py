@@ -1,9 +1,103 @@
 """TODO improve main heuristic"""
 
 import math
+import random
+import time
+import timeit
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+try:
+    from isolation import board_tables, knight_reach
+except ImportError:
+    # the stock isolation package this file is also reviewed against has no
+    # knight tables; build the ones the endgame solver uses from the knight
+    # offsets instead
+    BoardTables = namedtuple("BoardTables", ["coords", "attack_masks"])
+
+    _BOARD_TABLES = dict()
+
+    def board_tables(width, height):
+        """Return the (row, col) of each square index (`row + col * height`)
+        and the bitmask of the knight moves from each square.
+        """
+        key = (width, height)
+        tables = _BOARD_TABLES.get(key)
+        if tables is None:
+            directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                          (1, -2), (1, 2), (2, -1), (2, 1)]
+            coords = [(idx % height, idx // height) for idx in range(width * height)]
+            attack_masks = [sum(1 << (r + dr + (c + dc) * height) for dr, dc in directions
+                                if 0 <= r + dr < height and 0 <= c + dc < width)
+                            for r, c in coords]
+            tables = BoardTables(coords, attack_masks)
+            _BOARD_TABLES[key] = tables
+        return tables
+
+    def knight_reach(tables, squares, open_mask, steps):
+        """Flood fill over open squares: return the bitmask of squares of
+        `open_mask` that a knight starting on any square of `squares` reaches
+        in 1 to `steps` jumps, landing only on open squares.
+        """
+        reached = 0
+        frontier = squares
+        for _ in range(steps):
+            attacks = 0
+            while frontier:
+                bit = frontier & -frontier
+                frontier ^= bit
+                attacks |= tables.attack_masks[bit.bit_length() - 1]
+            frontier = attacks & open_mask & ~reached
+            if not frontier:
+                break
+            reached |= frontier
+        return reached
+
+
+# Default number of entries in an evaluation cache
+EVAL_CACHE_SIZE = 2 ** 16
+
+# Default number of entries in the AlphaBetaPlayer transposition table
+TT_SIZE = 2 ** 16
+
+# Default half-width of the aspiration window opened around the score of the
+# previous iterative deepening pass
+ASPIRATION_WINDOW = 2.
+
+# Lowest timer threshold (in milliseconds) a TimeManager may settle on
+MIN_TIMER_THRESHOLD = 5.
+
+# Target time (in milliseconds) between two reads of the clock during a
+# search; the number of nodes between reads is calibrated to match it
+CLOCK_CHECK_PERIOD = 0.5
+
+# Upper bound on the number of nodes searched between two reads of the clock
+MAX_CHECK_INTERVAL = 1024
 
+# Width of the null window PVSPlayer searches the moves after the first with
+NULL_WINDOW = 1e-9
 
-SCORES = dict()
+# Time (in milliseconds) kept by a parallel search for the workers to send
+# their results back before the timer threshold
+PARALLEL_MARGIN = 5.
+
+# Number of (region, square) entries the endgame solver of a player keeps
+# before starting over
+ENDGAME_MEMO_SIZE = 2 ** 18
+
+# Share of the time left for a move the endgame solver may use; if it cannot
+# solve the position in time, the rest goes to the regular search
+ENDGAME_TIME_SHARE = 0.5
+
+# XOR-ed into Board.hash() when the searching player is player 2, so that
+# one table can serve a player in both seats
+PERSPECTIVE_KEY = 0x9E3779B97F4A7C15
+
+# Number of plies from the start of a game during which positions are keyed
+# by the smallest key of their symmetric images (see `canonical_position()`),
+# so that the symmetric positions of the opening share table and cache
+# entries; 0 keys every position by Board.hash()
+SYMMETRY_PLIES = 4
 
 
 class SearchTimeout(Exception):
@@ -11,6 +105,148 @@ class SearchTimeout(Exception):
     pass
 
 
+class EvaluationCache:
+    """Base class for bounded caches of heuristic scores keyed by
+    `position_key()`. Subclasses implement the eviction policy.
+
+    Parameters
+    ----------
+    capacity : int (optional)
+        Maximum number of scores kept; 0 disables caching.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Counters since the cache was created or its stats were reset.
+    """
+
+    def __init__(self, capacity=EVAL_CACHE_SIZE):
+        if capacity < 0:
+            raise ValueError("Evaluation cache capacity must not be negative, got {}".format(capacity))
+        self.capacity = capacity
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return the counters and current size as a dict."""
+        return {"size": len(self), "capacity": self.capacity, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def get(self, key):
+        """Return the cached score for key, or None on a miss."""
+        raise NotImplementedError
+
+    def put(self, key, value):
+        """Cache a score, evicting another one if the cache is full."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every cached score; counters are kept."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class LRUCache(EvaluationCache):
+    """Evaluation cache that evicts the least recently used score."""
+
+    def __init__(self, capacity=EVAL_CACHE_SIZE):
+        super().__init__(capacity)
+        self._scores = OrderedDict()
+
+    def get(self, key):
+        value = self._scores.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.capacity:
+            return
+        if key not in self._scores and len(self._scores) >= self.capacity:
+            self._scores.popitem(last=False)
+            self.evictions += 1
+        self._scores[key] = value
+
+    def clear(self):
+        self._scores.clear()
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class ClockCache(EvaluationCache):
+    """Evaluation cache with CLOCK (second chance) eviction. Cheaper than LRU
+    on hits: a hit only sets a reference bit instead of reordering entries.
+    """
+
+    def __init__(self, capacity=EVAL_CACHE_SIZE):
+        super().__init__(capacity)
+        self.clear()
+
+    def get(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self._referenced[slot] = True
+        self.hits += 1
+        return self._values[slot]
+
+    def put(self, key, value):
+        if not self.capacity:
+            return
+        slot = self._slots.get(key)
+        if slot is None:
+            if len(self._keys) < self.capacity:
+                slot = len(self._keys)
+                self._keys.append(key)
+                self._values.append(value)
+                self._referenced.append(False)
+            else:
+                # advance the hand past referenced slots, clearing their bit
+                while self._referenced[self._hand]:
+                    self._referenced[self._hand] = False
+                    self._hand = (self._hand + 1) % self.capacity
+                slot = self._hand
+                self._hand = (self._hand + 1) % self.capacity
+                del self._slots[self._keys[slot]]
+                self._keys[slot] = key
+                self._referenced[slot] = False
+                self.evictions += 1
+            self._slots[key] = slot
+        self._values[slot] = value
+
+    def clear(self):
+        self._slots = dict()
+        self._keys = []
+        self._values = []
+        self._referenced = []
+        self._hand = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+
+EVAL_CACHE_POLICIES = {"lru": LRUCache, "clock": ClockCache}
+
+# Cache used by custom_score for players that do not carry an `eval_cache`
+EVAL_CACHE = LRUCache()
+
+# Endgame tablebase custom_score looks positions up in before scoring them,
+# e.g. `tablebase.Tablebase("tablebase.bin")`; None disables the lookup.
+# The batched scores of `batch_eval` do not use it.
+TABLEBASE = None
+
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -41,13 +277,22 @@ def custom_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    global SCORES
+    # exact value of the endgame positions covered by the tablebase
+
+    if TABLEBASE is not None:
+        val = TABLEBASE.score(game, player)
+        if val is not None:
+            return val
 
     # retrieve score from cache if any
 
-    game_hash = game.hash()
-    if game_hash in SCORES:
-        return SCORES[game_hash]
+    cache = getattr(player, "eval_cache", None)
+    if cache is None:
+        cache = EVAL_CACHE
+    game_key = position_key(game, player)
+    val = cache.get(game_key)
+    if val is not None:
+        return val
 
     p1 = player
     p2 = game.get_opponent(player)
@@ -87,7 +332,7 @@ def custom_score(game, player):
 
     # store score
 
-    SCORES[game_hash] = val
+    cache.put(game_key, val)
 
     return val
 
@@ -161,18 +406,12 @@ def custom_score_3(game, player):
     return distance_between(pos_p1, pos_p2)
 
 
-def nested_available_moves_impact(game, player):
-    direct_moves = game.get_legal_moves(player)
-
-    level_1_moves = set()
-    for m in direct_moves:
-        level_1_moves = level_1_moves.union(game._Board__get_moves(m))
-
-    level_2_moves = set()
-    for m in level_1_moves:
-        level_2_moves = level_2_moves.union(game._Board__get_moves(m))
-
-    return len(set().union(direct_moves, level_1_moves, level_2_moves))
+def nested_available_moves_impact(game, player, steps=3):
+    """Number of blank squares the player can reach within `steps` moves,
+    i.e. its legal moves and the squares nested two levels below them.
+    Boards without `Board.reach_count()` are flood-filled by `reach_mask()`.
+    """
+    return bin(reach_mask(game, game.get_player_location(player), steps)).count("1")
 
 
 def get_game_progress(game):
@@ -200,9 +439,11 @@ def centerness(game, player):
     Returns
     -------
     float
-        Distance from center score
+        Distance from center score; 0 for a player not placed yet
     """
     current_location = game.get_player_location(player)
+    if current_location is None:
+        return 0.
 
     center_row_idx = game.height/2-0.5
     center_col_idx = game.width/2-0.5
@@ -236,6 +477,575 @@ def distance_between(pos1, pos2):
     return math.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)
 
 
+def position_key(game, player):
+    """
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : object
+        A player instance in the current game (i.e., an object corresponding to
+        one of the player objects `game.__player_1__` or `game.__player_2__`.)
+
+    Returns
+    -------
+    int
+        Key of the game state as seen by the given player; the same state
+        maps to different keys for player 1 and player 2
+    """
+    return canonical_position(game, player)[0]
+
+
+def canonical_position(game, player):
+    """Return `position_key()` of a game state along with the symmetry
+    relating the state to the one the key stands for.
+
+    During the first `SYMMETRY_PLIES` plies, the symmetric images of a
+    position share the key of the image with the smallest Board.hash()
+    (see `Board.canonical_hash()`); the scores of `custom_score` do not
+    change under the board symmetries. Moves stored under the key are
+    given for that image and are mapped with `Board.transform_move()`.
+    A Board without `canonical_hash()` keys every position by its own
+    Board.hash().
+
+    Returns
+    -------
+    (int, int)
+        The key, and the index of the symmetry mapping the state to the
+        image the key stands for (0, the identity, after the first plies)
+    """
+    if game.move_count < SYMMETRY_PLIES and hasattr(game, "canonical_hash"):
+        key, sym = game.canonical_hash()
+    else:
+        key, sym = game.hash(), 0
+    if (game.active_player == player) != (game.move_count % 2 == 0):
+        key ^= PERSPECTIVE_KEY
+    return key, sym
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by `position_key()`.
+
+    Each entry is a tuple (key, depth, value, bound, move). The table never
+    grows past `size` buckets; when two keys map to the same bucket the
+    replacement scheme decides which entry is kept.
+
+    Parameters
+    ----------
+    size : int (optional)
+        Number of buckets in the table.
+
+    replacement : str (optional)
+        One of "depth" (keep the entry searched deepest), "always" (keep the
+        newest entry) or "two_tier" (each bucket holds a depth-preferred and
+        an always-replace entry).
+    """
+
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    REPLACEMENT_SCHEMES = ("depth", "always", "two_tier")
+
+    def __init__(self, size=TT_SIZE, replacement="depth"):
+        if size < 1:
+            raise ValueError("Transposition table size must be positive, got {}".format(size))
+        if replacement not in self.REPLACEMENT_SCHEMES:
+            raise ValueError("Unknown replacement scheme: {}".format(replacement))
+        self.size = size
+        self.replacement = replacement
+        self._ways = 2 if replacement == "two_tier" else 1
+        self.clear()
+
+    def __len__(self):
+        return sum(1 for entry in self._entries if entry is not None)
+
+    def clear(self):
+        """Drop every entry from the table."""
+        self._entries = [None] * (self.size * self._ways)
+
+    @staticmethod
+    def bound(value, alpha=None, beta=None):
+        """Return the bound type of a value searched in the (alpha, beta)
+        window; a missing bound never cuts the search.
+        """
+        if alpha is not None and value <= alpha:
+            return TranspositionTable.UPPER
+        if beta is not None and value >= beta:
+            return TranspositionTable.LOWER
+        return TranspositionTable.EXACT
+
+    def probe(self, key):
+        """Return the entry stored for key, or None."""
+        idx = (key % self.size) * self._ways
+        for entry in self._entries[idx:idx + self._ways]:
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def lookup(self, key, depth, alpha=None, beta=None):
+        """
+        Returns
+        -------
+        (float or None, (int, int) or None)
+            The stored value when the entry is at least as deep as `depth`
+            and its bound settles the (alpha, beta) window, otherwise None;
+            and the best move stored for the position, if any.
+        """
+        entry = self.probe(key)
+        if entry is None:
+            return None, None
+
+        _, entry_depth, value, bound, move = entry
+        if entry_depth >= depth:
+            if (bound == TranspositionTable.EXACT or
+                    (bound == TranspositionTable.LOWER and beta is not None and value >= beta) or
+                    (bound == TranspositionTable.UPPER and alpha is not None and value <= alpha)):
+                return value, move
+
+        return None, move
+
+    def store(self, key, depth, value, bound, move=None):
+        """Save a search result, subject to the replacement scheme."""
+        entry = (key, depth, value, bound, move)
+        idx = (key % self.size) * self._ways
+
+        if self.replacement == "always":
+            self._entries[idx] = entry
+            return
+
+        kept = self._entries[idx]
+        if kept is None or kept[0] == key or depth >= kept[1]:
+            self._entries[idx] = entry
+            # in a two-tier bucket the displaced deep entry is demoted
+            if self._ways == 2 and kept is not None and kept[0] != key:
+                self._entries[idx + 1] = kept
+        elif self._ways == 2:
+            self._entries[idx + 1] = entry
+
+
+class MoveOrdering:
+    """Order the moves searched at each node to get alpha-beta cutoffs early.
+
+    The principal variation move (the best move stored for the position) is
+    tried first, then the killer moves of the ply, then the remaining moves
+    by history score plus the optional static pre-score. Ties are broken by
+    the move coordinates, so the order does not depend on the shuffled move
+    generation of `Board`.
+
+    Parameters
+    ----------
+    num_killers : int (optional)
+        Number of killer moves remembered per ply.
+
+    presort : callable (optional)
+        A function (game, move) -> float giving a cheap static score of a
+        move from the current state, higher first; e.g. `onward_moves`.
+    """
+
+    def __init__(self, num_killers=2, presort=None):
+        self.num_killers = num_killers
+        self.presort = presort
+        self.killers = dict()
+        self.history = dict()
+
+    def new_move(self):
+        """Forget the killer moves and age the history scores before the
+        search of a new move, since plies then refer to other positions.
+        """
+        self.killers.clear()
+        self.history = {m: score // 2 for m, score in self.history.items() if score > 1}
+
+    def order(self, game, moves, ply, first_move=None):
+        """Return the moves of `game` in the order they should be searched.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The game state the moves are made from
+
+        moves : list<(int, int)>
+            The legal moves of the active player
+
+        ply : int
+            Number of plies between the root of the search and this node
+
+        first_move : (int, int) (optional)
+            The principal variation move of the node, if known
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history
+        presort = self.presort
+        ranked = []
+        for m in moves:
+            if m == first_move:
+                rank = (0, 0)
+            elif m in killers:
+                rank = (1, killers.index(m))
+            else:
+                score = history.get(m, 0)
+                if presort is not None:
+                    score += presort(game, m)
+                rank = (2, -score)
+            ranked.append((rank, m))
+        ranked.sort()
+        return [m for _, m in ranked]
+
+    def record_cutoff(self, move, ply, depth):
+        """Credit a move that caused a beta cutoff `depth` plies above the
+        search horizon.
+        """
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.num_killers:]
+
+
+def onward_moves(game, move):
+    """Static move pre-score: number of moves the active player would have
+    from `move` on the next turn.
+    """
+    return len(game._Board__get_moves(move))
+
+
+def order_moves(moves, first_move):
+    """Move `first_move` to the front of `moves` (in place) if present."""
+    if first_move is not None and first_move in moves:
+        moves.remove(first_move)
+        moves.insert(0, first_move)
+    return moves
+
+
+def partition(game):
+    """Detect whether the two players are cut off from each other.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    Returns
+    -------
+    (int, int, int, int) or None
+        The square index and the bitmask of the reachable region of the
+        active player, then the same for the inactive player, if their
+        regions share no square; None otherwise, or if a player has not
+        been placed yet.
+    """
+    own_loc = game.get_player_location(game.active_player)
+    opp_loc = game.get_player_location(game.inactive_player)
+    if own_loc is None or opp_loc is None:
+        return None
+
+    height = game.height
+    own_idx = own_loc[0] + own_loc[1] * height
+    opp_idx = opp_loc[0] + opp_loc[1] * height
+    own_region = reach_mask(game, own_loc)
+    opp_region = reach_mask(game, opp_loc)
+    if own_region & opp_region:
+        return None
+    return own_idx, own_region, opp_idx, opp_region
+
+
+def reach_mask(game, loc, steps=None):
+    """Return `Board.reach_mask()`, the bitmask of the blank squares a knight
+    standing on `loc` can reach in 1 to `steps` moves (any number if None),
+    built from the public Board API on a Board without it.
+    """
+    if hasattr(game, "reach_mask"):
+        return game.reach_mask(loc, steps)
+    height = game.height
+    tables = board_tables(game.width, height)
+    open_mask = 0
+    for row, col in game.get_blank_spaces():
+        open_mask |= 1 << (row + col * height)
+    if loc is None:
+        return open_mask
+    return knight_reach(tables, 1 << (loc[0] + loc[1] * height), open_mask,
+                        steps or len(tables.coords))
+
+
+def longest_path(tables, idx, region, memo, tick=None):
+    """Exact number of moves of the longest knight path from square `idx`
+    over the squares of `region`.
+
+    Parameters
+    ----------
+    tables : isolation.BoardTables
+        The tables of the board size, see `isolation.board_tables()`
+
+    idx : int
+        Square index of the knight
+
+    region : int
+        Bitmask of the squares the knight may still land on
+
+    memo : dict
+        Results already solved, keyed by (region, idx)
+
+    tick : callable (optional)
+        Called once for every position solved, e.g. to check the clock
+
+    Returns
+    -------
+    int
+        The number of moves of the longest path
+    """
+    moves = tables.attack_masks[idx] & region
+    if moves & (moves - 1):
+        # squares the knight cannot reach any more do not change the
+        # result; behind a single move, the child reduces the region itself
+        region = knight_reach(tables, moves, region, len(tables.coords)) | moves
+    key = (region, idx)
+    length = memo.get(key)
+    if length is not None:
+        return length
+    if tick is not None:
+        tick()
+
+    # a path cannot be longer than the number of squares left
+    bound = bin(region).count("1")
+    length = 0
+    while moves and length < bound:
+        bit = moves & -moves
+        moves ^= bit
+        length = max(length, 1 + longest_path(tables, bit.bit_length() - 1,
+                                               region ^ bit, memo, tick))
+    memo[key] = length
+    return length
+
+
+class TimeManager:
+    """Decide whether iterative deepening should start another iteration,
+    and tune the timer threshold of the player from its timeouts.
+
+    The cost of the next iteration is predicted from the durations of the
+    completed ones: the last duration times the growth of the last two
+    iterations (their geometric mean, which smooths the odd/even depth
+    effect of alpha-beta), or times the number of root moves while only one
+    iteration is known. The search stops when the prediction does not fit
+    in the time left above the threshold, instead of starting an iteration
+    that the timer would cut off.
+
+    When the timer does cut a search, the part of the threshold used up
+    before the move was returned (overshoot past the check, unwinding the
+    search, picking the move) is recorded. Once timeouts have been seen the
+    threshold becomes `safety` times the largest of the last `window` of
+    them, never less than `min_threshold`; it may shrink below or grow above
+    the threshold the player was built with.
+
+    Parameters
+    ----------
+    safety : float (optional)
+        Factor applied to the largest threshold use observed.
+
+    min_threshold : float (optional)
+        Lowest threshold, in milliseconds.
+
+    window : int (optional)
+        Number of recent timeouts taken into account.
+    """
+
+    def __init__(self, safety=2., min_threshold=MIN_TIMER_THRESHOLD, window=16):
+        self.safety = safety
+        self.min_threshold = min_threshold
+        self.threshold_use = deque(maxlen=window)
+        self.iteration_times = []
+        self.branching = 1
+        self._time_left = None
+        self._mark = 0.
+
+    def begin_move(self, time_left, branching):
+        """Start timing the iterations of a move with `branching` root
+        moves.
+        """
+        self._time_left = time_left
+        self.branching = max(branching, 1)
+        self.iteration_times = []
+        self._mark = time_left()
+
+    def iteration_done(self):
+        """Record the duration of the iteration that just completed."""
+        now = self._time_left()
+        self.iteration_times.append(self._mark - now)
+        self._mark = now
+
+    def predict_next(self):
+        """Return the predicted duration of the next iteration, in
+        milliseconds.
+        """
+        times = self.iteration_times
+        if not times:
+            return 0.
+        ratios = [times[i] / times[i - 1] for i in range(max(len(times) - 2, 1), len(times))
+                  if times[i - 1] > 0]
+        if ratios:
+            growth = math.exp(sum(math.log(max(r, 1.)) for r in ratios) / len(ratios))
+        else:
+            growth = self.branching
+        return times[-1] * growth
+
+    def can_finish_next(self, threshold):
+        """Return True if the next iteration is expected to complete before
+        the time left reaches `threshold`.
+        """
+        return self.predict_next() < self._mark - threshold
+
+    def record_timeout(self, threshold, time_left):
+        """Record a search cut by the timer at `threshold` that returned
+        with `time_left` milliseconds left.
+        """
+        self.threshold_use.append(threshold - time_left)
+
+    def threshold(self, default):
+        """Return the timer threshold to use, `default` until a timeout has
+        been recorded.
+        """
+        if not self.threshold_use:
+            return default
+        return max(self.min_threshold, self.safety * max(self.threshold_use))
+
+
+class SearchStats:
+    """Collector of per-move search statistics, attached to a player with
+    the `stats` argument of `IsolationPlayer`. A player without a collector
+    skips every hook.
+
+    The search calls `node()`, `cutoff()`, `evaluation()` and `tt_hit()`
+    while it runs; `begin_move()`, `begin_iteration()`, `end_iteration()`
+    and `end_move()` delimit the moves and their iterative deepening passes.
+    Subclasses may override the hooks to collect something else.
+
+    Attributes
+    ----------
+    moves : list of dict
+        One record per move searched: the move count of the board, the move
+        returned, the deepest completed iteration, the evaluation cache hits
+        and misses, the milliseconds left on the clock at return, and the
+        list of iterations with their depth, nodes, cutoffs, evaluations,
+        transposition table hits, seconds and whether they completed.
+    """
+
+    COUNTERS = ("nodes", "cutoffs", "evaluations", "tt_hits")
+
+    def __init__(self):
+        self.moves = []
+        self._record = None
+        self._iteration = None
+        self.nodes = self.cutoffs = self.evaluations = self.tt_hits = 0
+
+    def clear(self):
+        """Drop every record."""
+        self.moves = []
+
+    def merge(self, records):
+        """Add move records collected elsewhere, e.g. in a worker process."""
+        self.moves.extend(records)
+
+    def begin_move(self, player, game):
+        cache = player.eval_cache if player.eval_cache is not None else EVAL_CACHE
+        self._cache = cache
+        self._cache_counts = (cache.hits, cache.misses)
+        self._record = {"move_count": game.move_count, "iterations": [], "depth": 0}
+        self._iteration = None
+
+    def begin_iteration(self, depth):
+        self.nodes = self.cutoffs = self.evaluations = self.tt_hits = 0
+        self._iteration = {"depth": depth, "completed": False}
+        self._iteration_start = timeit.default_timer()
+
+    def node(self):
+        self.nodes += 1
+
+    def cutoff(self):
+        self.cutoffs += 1
+
+    def evaluation(self, count=1):
+        self.evaluations += count
+
+    def tt_hit(self):
+        self.tt_hits += 1
+
+    def end_iteration(self, completed=True):
+        """Close the current iteration; a search cut by the timer is not
+        completed.
+        """
+        iteration = self._iteration
+        if iteration is None:
+            return
+        for counter in self.COUNTERS:
+            iteration[counter] = getattr(self, counter)
+        iteration["seconds"] = timeit.default_timer() - self._iteration_start
+        iteration["completed"] = completed
+        self._record["iterations"].append(iteration)
+        if completed:
+            self._record["depth"] = iteration["depth"]
+        self._iteration = None
+
+    def end_move(self, move, time_left):
+        """Close the record of the move returned with `time_left`
+        milliseconds left on the clock.
+        """
+        record = self._record
+        if record is None:
+            return
+        record["move"] = move
+        record["time_left"] = time_left
+        record["cache_hits"] = self._cache.hits - self._cache_counts[0]
+        record["cache_misses"] = self._cache.misses - self._cache_counts[1]
+        self.moves.append(record)
+        self._record = None
+
+    def summary(self):
+        """Aggregate the move records.
+
+        Returns
+        -------
+        dict
+            Number of moves, mean depth reached, totals of the counters, the
+            search time, nodes per second, evaluation cache hit rate, mean
+            and lowest time left at return, and the nodes and seconds spent
+            at each iteration depth.
+        """
+        return summarize_moves(self.moves)
+
+
+def summarize_moves(records):
+    """Aggregate a list of `SearchStats` move records, see
+    `SearchStats.summary()`.
+    """
+    summary = {counter: 0 for counter in SearchStats.COUNTERS}
+    summary.update({"moves": len(records), "seconds": 0., "cache_hits": 0,
+                    "cache_misses": 0, "depth_nodes": dict(), "depth_seconds": dict()})
+    depths = []
+    margins = []
+    for record in records:
+        depths.append(record["depth"])
+        if record.get("time_left") is not None:
+            margins.append(record["time_left"])
+        summary["cache_hits"] += record.get("cache_hits", 0)
+        summary["cache_misses"] += record.get("cache_misses", 0)
+        for iteration in record["iterations"]:
+            for counter in SearchStats.COUNTERS:
+                summary[counter] += iteration[counter]
+            summary["seconds"] += iteration["seconds"]
+            depth = iteration["depth"]
+            summary["depth_nodes"][depth] = summary["depth_nodes"].get(depth, 0) + iteration["nodes"]
+            summary["depth_seconds"][depth] = summary["depth_seconds"].get(depth, 0.) + iteration["seconds"]
+
+    lookups = summary["cache_hits"] + summary["cache_misses"]
+    summary["mean_depth"] = sum(depths) / len(depths) if depths else 0.
+    summary["nodes_per_sec"] = summary["nodes"] / summary["seconds"] if summary["seconds"] else 0.
+    summary["cache_hit_rate"] = summary["cache_hits"] / lookups if lookups else 0.
+    summary["mean_time_left"] = sum(margins) / len(margins) if margins else None
+    summary["min_time_left"] = min(margins) if margins else None
+    return summary
+
+
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents -- this class is never
     constructed or tested directly.
@@ -257,15 +1067,144 @@ class IsolationPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    eval_cache : EvaluationCache or str (optional)
+        Cache for the scores of this player; either a cache instance or the
+        name of a policy in `EVAL_CACHE_POLICIES` to build one of
+        `EVAL_CACHE_SIZE` entries. None falls back to the module-wide
+        `EVAL_CACHE`.
+
+    eval_scope : str (optional)
+        "agent" to keep cached scores across games, or "game" to clear them
+        whenever the player starts a new game, i.e. is asked to move against
+        another opponent or in a position that does not follow from the last
+        one it moved in.
+
+    in_place : bool (optional)
+        Search by making and taking back moves on the board passed to
+        get_move() (`Board.push_move()` / `Board.pop_move()`) instead of
+        copying the board at every node.
+
+    batch_score : callable (optional)
+        A function (game, moves, player) -> scores of all the children of a
+        position, equivalent to calling `score_fn` on each of them (see
+        `batch_eval`). When given, nodes one ply above the search horizon
+        score their children with a single call.
+
+    stats : SearchStats (optional)
+        Collector of per-move search statistics; None disables collection.
+
+    tablebase : object (optional)
+        Endgame tablebase (see `tablebase.Tablebase`); the search returns
+        the exact value of the positions it covers instead of searching
+        them, and AlphaBetaPlayer plays its best move at the root. None
+        disables the lookup.
     """
 
-    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 eval_cache="lru", eval_scope="agent", in_place=False, batch_score=None,
+                 stats=None, tablebase=None):
+        if eval_scope not in ("agent", "game"):
+            raise ValueError("Unknown evaluation cache scope: {}".format(eval_scope))
         self.search_depth = search_depth
         self.score = score_fn
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
         self.alpha = None
         self.beta = None
+        self.tt = None
+        self.ordering = None
+        self.root_depth = 0
+        self.pv_moves = dict()
+        if isinstance(eval_cache, str):
+            eval_cache = EVAL_CACHE_POLICIES[eval_cache]()
+        self.eval_cache = eval_cache
+        self.eval_scope = eval_scope
+        self.in_place = in_place
+        self.batch_score = batch_score
+        self.stats = stats
+        self.tablebase = tablebase
+        self._last_position = None
+        self._deadline = None
+        self._last_check = 0.
+        self._check_interval = 1
+        self._countdown = 1
+
+    def begin_move(self, game, time_left):
+        """Prepare the per-move state of the player before a search.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The game state the player is asked to move in
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn.
+        """
+        self.time_left = time_left
+
+        # absolute deadline of the search, on the clock of `timeit`
+        self._last_check = timeit.default_timer()
+        self._deadline = None
+        if callable(time_left):
+            self._deadline = self._last_check + (time_left() - self.TIMER_THRESHOLD) / 1000.
+        self._countdown = self._check_interval
+
+        if self.eval_scope == "game" and self.eval_cache is not None:
+            # the game goes on while the opponent is the same and every
+            # square blocked at the last move still is; anything else, e.g.
+            # another opening at the same or a higher move count, is a new
+            # game
+            position = (game.get_opponent(self), frozenset(game.get_blank_spaces()))
+            last = self._last_position
+            if last is not None and (position[0] is not last[0] or not position[1] <= last[1]):
+                self.eval_cache.clear()
+            self._last_position = position
+
+        if self.stats is not None:
+            self.stats.begin_move(self, game)
+
+    def end_move(self, move):
+        """Record the end of the search of a move and return the move."""
+        self.clear_deadline()
+        if self.stats is not None:
+            time_left = self.time_left() if callable(self.time_left) else None
+            self.stats.end_move(move, time_left)
+        return move
+
+    def clear_deadline(self):
+        """Drop the deadline set by `begin_move()`, so that searches called
+        directly afterwards with `time_left` set by hand read it again.
+        """
+        self._deadline = None
+        self._countdown = 1
+
+    def check_deadline(self):
+        """Raise SearchTimeout once the deadline set by `begin_move()` has
+        passed, and recalibrate the number of nodes searched before the
+        next call from the nodes per second measured since the last one.
+
+        Without a deadline (e.g. `time_left` set by hand) the time left is
+        read at every call.
+        """
+        if self._deadline is None:
+            self._countdown = 1
+            if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
+                raise SearchTimeout()
+            return
+
+        now = timeit.default_timer()
+        if now >= self._deadline:
+            raise SearchTimeout()
+
+        nodes = self._check_interval - max(self._countdown, 0)
+        elapsed = now - self._last_check
+        if nodes > 0 and elapsed > 0:
+            interval = int(nodes / elapsed * CLOCK_CHECK_PERIOD / 1000.)
+            self._check_interval = max(1, min(interval, 2 * self._check_interval, MAX_CHECK_INTERVAL))
+        self._countdown = self._check_interval
+        self._last_check = now
 
     def terminal_test(self, game, depth=None):
         """
@@ -281,8 +1220,10 @@ class IsolationPlayer:
             Return True if the game is over for the active player
             and False otherwise.
         """
-        if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        # the clock is read every `_check_interval` nodes only
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self.check_deadline()
 
         if (depth is not None) and (depth == 0):
             return True
@@ -314,23 +1255,81 @@ class IsolationPlayer:
 
         v = float("inf")
 
-        if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        stats = self.stats
+        if stats is not None:
+            stats.node()
 
         if self.terminal_test(game, depth):
+            if stats is not None:
+                stats.evaluation()
             return self.score(game, self)
 
-        for m in game.get_legal_moves():
+        if self.tablebase is not None:
+            value = self.tablebase.score(game, self)
+            if value is not None:
+                return value
+
+        moves = game.get_legal_moves()
+        tt_move = None
+        if self.tt is not None:
+            key, sym = canonical_position(game, self)
+            value, tt_move = self.tt.lookup(key, depth, alpha, beta)
+            if value is not None:
+                if stats is not None:
+                    stats.tt_hit()
+                return value
+            if tt_move is None and self.pv_moves:
+                tt_move = self.pv_moves.get(key)
+            if sym and tt_move is not None:
+                tt_move = game.transform_move(tt_move, sym, inverse=True)
+            alpha_orig, beta_orig = alpha, beta
+
+        if self.ordering is not None:
+            ply = self.root_depth - depth
+            moves = self.ordering.order(game, moves, ply, tt_move)
+        else:
+            order_moves(moves, tt_move)
+
+        best_move = None
+        if self.batch_score is not None and depth == 1:
+            # frontier node: score all the children in a single call
+            values = list(self.batch_score(game, moves, self))
+            if stats is not None:
+                stats.evaluation(len(values))
+            v = min(values)
+            best_move = moves[values.index(v)]
+        else:
+            for m in moves:
 
-            v = min(v, self.max_value(game.forecast_move(m), depth - 1, alpha, beta))
+                if self.in_place:
+                    game.push_move(m)
+                    try:
+                        child_v = self.max_value(game, depth - 1, alpha, beta)
+                    finally:
+                        game.pop_move()
+                else:
+                    child_v = self.max_value(game.forecast_move(m), depth - 1, alpha, beta)
+
+                if best_move is None or child_v < v:
+                    v = child_v
+                    best_move = m
 
-            # if maximum is already more than it can be then skip rest
-            if (alpha is not None) and (v <= alpha):
-                break
+                # if maximum is already more than it can be then skip rest
+                if (alpha is not None) and (v <= alpha):
+                    if self.ordering is not None:
+                        self.ordering.record_cutoff(m, ply, depth)
+                    if stats is not None:
+                        stats.cutoff()
+                    break
 
-            # update upper bound
-            if beta is not None:
-                beta = min(beta, v)
+                # update upper bound
+                if beta is not None:
+                    beta = min(beta, v)
+
+        if self.tt is not None:
+            if sym and best_move is not None:
+                best_move = game.transform_move(best_move, sym)
+            self.tt.store(key, depth, v, TranspositionTable.bound(v, alpha_orig, beta_orig), best_move)
 
         return v
 
@@ -359,23 +1358,81 @@ class IsolationPlayer:
 
         v = float("-inf")
 
-        if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        stats = self.stats
+        if stats is not None:
+            stats.node()
 
         if self.terminal_test(game, depth):
+            if stats is not None:
+                stats.evaluation()
             return self.score(game, self)
 
-        for m in game.get_legal_moves():
+        if self.tablebase is not None:
+            value = self.tablebase.score(game, self)
+            if value is not None:
+                return value
+
+        moves = game.get_legal_moves()
+        tt_move = None
+        if self.tt is not None:
+            key, sym = canonical_position(game, self)
+            value, tt_move = self.tt.lookup(key, depth, alpha, beta)
+            if value is not None:
+                if stats is not None:
+                    stats.tt_hit()
+                return value
+            if tt_move is None and self.pv_moves:
+                tt_move = self.pv_moves.get(key)
+            if sym and tt_move is not None:
+                tt_move = game.transform_move(tt_move, sym, inverse=True)
+            alpha_orig, beta_orig = alpha, beta
+
+        if self.ordering is not None:
+            ply = self.root_depth - depth
+            moves = self.ordering.order(game, moves, ply, tt_move)
+        else:
+            order_moves(moves, tt_move)
+
+        best_move = None
+        if self.batch_score is not None and depth == 1:
+            # frontier node: score all the children in a single call
+            values = list(self.batch_score(game, moves, self))
+            if stats is not None:
+                stats.evaluation(len(values))
+            v = max(values)
+            best_move = moves[values.index(v)]
+        else:
+            for m in moves:
 
-            v = max(v, self.min_value(game.forecast_move(m), depth - 1, alpha, beta))
+                if self.in_place:
+                    game.push_move(m)
+                    try:
+                        child_v = self.min_value(game, depth - 1, alpha, beta)
+                    finally:
+                        game.pop_move()
+                else:
+                    child_v = self.min_value(game.forecast_move(m), depth - 1, alpha, beta)
+
+                if best_move is None or child_v > v:
+                    v = child_v
+                    best_move = m
 
-            # if maximum is already more than it can be then skip rest
-            if (beta is not None) and (v >= beta):
-                break
+                # if maximum is already more than it can be then skip rest
+                if (beta is not None) and (v >= beta):
+                    if self.ordering is not None:
+                        self.ordering.record_cutoff(m, ply, depth)
+                    if stats is not None:
+                        stats.cutoff()
+                    break
 
-            # update lower bound
-            if alpha is not None:
-                alpha = max(alpha, v)
+                # update lower bound
+                if alpha is not None:
+                    alpha = max(alpha, v)
+
+        if self.tt is not None:
+            if sym and best_move is not None:
+                best_move = game.transform_move(best_move, sym)
+            self.tt.store(key, depth, v, TranspositionTable.bound(v, alpha_orig, beta_orig), best_move)
 
         return v
 
@@ -418,23 +1475,31 @@ class MinimaxPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self.begin_move(game, time_left)
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
 
+        if self.stats is not None:
+            self.stats.begin_iteration(self.search_depth)
+
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
-            return self.minimax(game, self.search_depth)
+            best_move = self.minimax(game, self.search_depth)
+            if self.stats is not None:
+                self.stats.end_iteration()
+            return self.end_move(best_move)
 
         except SearchTimeout:
+            if self.stats is not None:
+                self.stats.end_iteration(completed=False)
             moves = game.get_legal_moves()
             if len(moves) > 0:
                 best_move = moves[0]  # whatever move to keep playing
 
-        return best_move
+        return self.end_move(best_move)
 
     def minimax(self, game, depth):
         """Implement depth-limited minimax search algorithm as described in
@@ -479,12 +1544,19 @@ class MinimaxPlayer(IsolationPlayer):
         score = float("-inf")
         moves = game.get_legal_moves(self)
 
-        if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.check_deadline()
 
         if depth > 0 and len(game.get_legal_moves()) > 0:
             for m in moves:
-                v = self.min_value(game.forecast_move(m), depth - 1)
+                if self.in_place:
+                    game.push_move(m)
+                    try:
+                        v = self.min_value(game, depth - 1)
+                    finally:
+                        game.pop_move()
+                else:
+                    v = self.min_value(game.forecast_move(m), depth - 1)
+
                 if v > score:
                     score = v
                     best_move = m
@@ -499,12 +1571,95 @@ class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        Number of buckets in the transposition table shared by every search
+        of this player; 0 disables the table.
+
+    tt_replacement : str (optional)
+        Replacement scheme of the transposition table, see
+        `TranspositionTable`.
+
+    ordering : MoveOrdering or bool (optional)
+        Move ordering used by the search; True builds a default
+        `MoveOrdering`, False searches the moves in generation order (apart
+        from the transposition table move).
+
+    aspiration : float (optional)
+        Half-width of the window searched around the previous iteration's
+        score; a score outside the window is searched again with that side
+        opened. 0 searches every iteration with a full window.
+
+    time_manager : TimeManager or bool (optional)
+        Decides when to stop deepening and adjusts `TIMER_THRESHOLD`; True
+        builds a default `TimeManager`, False deepens until the timer cuts
+        the search with a fixed threshold.
+
+    workers : int (optional)
+        Number of processes searching each move. With more than one, the
+        root moves are dealt out to a pool of worker processes, each running
+        its own iterative deepening search of its share with its own
+        transposition table (see `parallel_move()`). The pool is started
+        with the player; call `close()` to stop it.
+
+    endgame : bool (optional)
+        Once the players are cut off from each other (see `partition()`),
+        play the longest path of the player's region found by the exact
+        solver instead of searching (see `endgame_move()`).
     """
 
     # use min/max from super class
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tt_size=TT_SIZE, tt_replacement="depth", ordering=True,
+                 aspiration=ASPIRATION_WINDOW, time_manager=True, workers=1, endgame=True,
+                 **kwargs):
         super().__init__(*args, **kwargs)
 
+        # arguments of the players searching in the worker processes
+        worker_kwargs = dict(kwargs, tt_size=tt_size, tt_replacement=tt_replacement,
+                             ordering=ordering, aspiration=aspiration, time_manager=False)
+        worker_kwargs.pop("stats", None)
+        self._worker_config = (type(self), args, worker_kwargs)
+        self._worker_key = random.getrandbits(64)
+        self.workers = workers
+        self._executor = None
+        self._pending = []
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            # start the processes now rather than during the first move
+            list(self._executor.map(_start_worker, range(workers)))
+
+        if tt_size:
+            self.tt = TranspositionTable(tt_size, tt_replacement)
+        if ordering is True:
+            ordering = MoveOrdering()
+        self.ordering = ordering or None
+        self.aspiration = aspiration
+        if time_manager is True:
+            time_manager = TimeManager()
+        self.time_manager = time_manager or None
+        self.root_scores = dict()
+        self.pv = []
+        self.fail_high_move = None
+        self.endgame = endgame
+        self.endgame_memo = dict()
+        self._endgame_size = None
+
+    def __getstate__(self):
+        # a copy sent to another process starts its own pool if it needs one
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_pending"] = []
+        return state
+
+    def close(self):
+        """Stop the worker processes of a parallel player."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._pending = []
+
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
         result before the time limit expires.
@@ -535,28 +1690,138 @@ class AlphaBetaPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self.begin_move(game, time_left)
+
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(game)
+            if move is not None:
+                return self.end_move(move)
+
+        if self.endgame:
+            move = self.endgame_move(game)
+            if move is not None:
+                return self.end_move(move)
+
+        if self.workers > 1:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.end_move(self.parallel_move(game, time_left))
+
+        if self.ordering is not None:
+            self.ordering.new_move()
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
 
+        # Scores of the root moves and the principal variation of the last
+        # completed iteration, used to order the next one
+        self.root_scores = dict()
+        self.pv = []
+        self.pv_moves = dict()
+        self.fail_high_move = None
+
+        time_manager = self.time_manager
+        if time_manager is not None:
+            time_manager.begin_move(time_left, len(game.get_legal_moves()))
+
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
             depth = 1
+            score = None
             while True:
-                best_move = self.alphabeta(game, depth)
+                if self.stats is not None:
+                    self.stats.begin_iteration(depth)
+                move, score = self.aspiration_search(game, depth, score, best_move)
+                if self.stats is not None:
+                    self.stats.end_iteration()
+                if move == (-1, -1):
+                    break
+                best_move = move
+                self.update_pv(game, depth)
+
+                # a won or lost game does not change with a deeper search
+                if math.isinf(score):
+                    break
+
+                # do not start an iteration the timer would cut off
+                if time_manager is not None:
+                    time_manager.iteration_done()
+                    if not time_manager.can_finish_next(self.TIMER_THRESHOLD):
+                        break
                 depth += 1
 
         except SearchTimeout:
-            pass
+            timed_out = True
+            if self.stats is not None:
+                self.stats.end_iteration(completed=False)
+            if self.fail_high_move is not None:
+                best_move = self.fail_high_move
+        else:
+            timed_out = False
 
         moves = game.get_legal_moves(self)
 
         if best_move == (-1, -1) and len(moves) > 0:
             best_move = moves[0]
 
+        if time_manager is not None:
+            if timed_out:
+                time_manager.record_timeout(self.TIMER_THRESHOLD, time_left())
+            self.TIMER_THRESHOLD = time_manager.threshold(self.TIMER_THRESHOLD)
+
+        return self.end_move(best_move)
+
+    def endgame_move(self, game):
+        """Return the first move of the longest path of the active player if
+        the players are cut off from each other, or None otherwise.
+
+        Once the regions of the players are disjoint the game is two
+        independent longest path problems: each player makes as many moves
+        as its longest path allows and the first one to run out loses,
+        whatever the other does. The path is solved exactly by
+        `longest_path()`, memoized in `endgame_memo` across moves. None is
+        also returned if the solver does not solve every move within
+        `ENDGAME_TIME_SHARE` of the time left, leaving the rest to the
+        regular search; the positions it solved stay in the memo for the
+        next move.
+        """
+        regions = partition(game)
+        if regions is None:
+            return None
+
+        size = (game.width, game.height)
+        if size != self._endgame_size or len(self.endgame_memo) > ENDGAME_MEMO_SIZE:
+            self.endgame_memo.clear()
+            self._endgame_size = size
+
+        def tick():
+            self._countdown -= 1
+            if self._countdown <= 0:
+                self.check_deadline()
+
+        idx, region = regions[:2]
+        tables = board_tables(*size)
+        moves = tables.attack_masks[idx] & region
+        best_move, best_length = None, -1
+        deadline = self._deadline
+        if deadline is not None:
+            now = timeit.default_timer()
+            self._deadline = now + max(deadline - now, 0.) * ENDGAME_TIME_SHARE
+        try:
+            while moves:
+                bit = moves & -moves
+                moves ^= bit
+                target = bit.bit_length() - 1
+                length = longest_path(tables, target, region ^ bit, self.endgame_memo, tick)
+                if length > best_length:
+                    best_move = (target % game.height, target // game.height)
+                    best_length = length
+        except SearchTimeout:
+            return None
+        finally:
+            self._deadline = deadline
         return best_move
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
@@ -605,15 +1870,146 @@ class AlphaBetaPlayer(IsolationPlayer):
                 each helper function or else your agent will timeout during
                 testing.
         """
+        return self.search_root(game, depth, alpha, beta)[0]
+
+    def aspiration_search(self, game, depth, prev_score=None, prev_move=(-1, -1)):
+        """Search the root to the given depth inside an aspiration window
+        around the score of the previous iteration, searching again with the
+        failing side opened when the score falls outside the window.
+
+        Returns
+        -------
+        ((int, int), float)
+            The best move and its score; the move is (-1, -1) if there are
+            no legal moves
+        """
+        if not self.aspiration or prev_score is None or math.isinf(prev_score):
+            return self.search_root(game, depth)
+
+        alpha = prev_score - self.aspiration
+        beta = prev_score + self.aspiration
+        move, score = self.search_root(game, depth, alpha, beta)
+
+        if score <= alpha:
+            return self.search_root(game, depth, float("-inf"), beta)
+
+        if score >= beta:
+            # the failing move already beats the window; get_move() keeps it
+            # if the time runs out before the re-search completes
+            self.fail_high_move = move
+            research_move, score = self.search_root(game, depth, alpha, float("inf"))
+            self.fail_high_move = None
+            if research_move != (-1, -1):
+                move = research_move
+
+        return move, score
+
+    def parallel_move(self, game, time_left):
+        """Search a move with the worker processes.
+
+        The root moves, ordered by `onward_moves()`, are dealt out to the
+        workers in turn. Each worker deepens on its share until a deadline
+        shared by all of them (the time left less the timer threshold and
+        `PARALLEL_MARGIN`, on the `time.monotonic()` clock) and sends back
+        its best move and score at every completed depth.
+        The move returned is the best one at the deepest depth every share
+        completed (a share proven won or lost counts as complete at every
+        depth); shares that did not report in time are left out.
+        """
+        moves = game.get_legal_moves()
+        if len(moves) < 2:
+            return moves[0] if moves else (-1, -1)
+
+        moves.sort(key=lambda m: (-onward_moves(game, m), m))
+        shares = [moves[i::self.workers] for i in range(min(self.workers, len(moves)))]
+        board = game.copy_with_players("player_1", "player_2")
+        slot = game.move_count % 2
+        # tasks of the previous move still running stop at their deadline,
+        # which has passed; let them free the workers first
+        if self._pending:
+            wait(self._pending, timeout=PARALLEL_MARGIN / 1000.)
+
+        # the deadline is absolute, on a clock shared by every process, so
+        # that time spent before a worker starts its task counts against it
+        deadline = time.monotonic() + (time_left() - self.TIMER_THRESHOLD - PARALLEL_MARGIN) / 1000.
+        futures = [self._executor.submit(_search_share, self._worker_key, self._worker_config,
+                                         board, slot, share, deadline)
+                   for share in shares]
+        wait(futures, timeout=max(time_left() - self.TIMER_THRESHOLD, 0.) / 1000.)
+
+        # drop the tasks that have not started, and keep track of the ones
+        # still running until the next move
+        self._pending = [future for future in futures
+                         if not future.done() and not future.cancel()]
+
+        reports = [future.result() for future in futures
+                   if future.done() and not future.cancelled() and future.exception() is None]
+        reports = [(results, proven) for results, proven in reports if results]
+        if not reports:
+            return moves[0]
+
+        open_depths = [len(results) for results, proven in reports if not proven]
+        depth = min(open_depths) if open_depths else max(len(results) for results, _ in reports)
+        best_move, best_score = moves[0], float("-inf")
+        for results, _ in reports:
+            move, score = results[min(depth, len(results)) - 1]
+            if move != (-1, -1) and score > best_score:
+                best_move, best_score = move, score
+        return best_move
+
+    def search_root(self, game, depth, alpha=float("-inf"), beta=float("inf"), moves=None):
+        """Alpha-beta search of the root position. Root moves are ordered by
+        the scores of the previous completed iteration, if any.
+
+        `moves` restricts the search to some of the root moves; the result
+        is then not stored in the transposition table.
+
+        Returns
+        -------
+        ((int, int), float)
+            The best move found, or (-1, -1) if no move scored above alpha,
+            and the best score of the searched moves
+        """
         best_move = (-1, -1)
+        best_score = float("-inf")
 
-        if callable(self.time_left) and self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.check_deadline()
 
+        self.root_depth = depth
+
+        all_moves = moves is None
         if depth > 0 and len(game.get_legal_moves()) > 0:
+            moves = game.get_legal_moves() if all_moves else list(moves)
+            tt_move = None
+            if self.tt is not None:
+                key, sym = canonical_position(game, self)
+                tt_move = self.tt.lookup(key, depth)[1]
+                if sym and tt_move is not None:
+                    tt_move = game.transform_move(tt_move, sym, inverse=True)
+                alpha_orig, beta_orig = alpha, beta
+
+            if self.root_scores:
+                prev_scores = self.root_scores
+                moves.sort(key=lambda m: (-prev_scores.get(m, float("-inf")), m))
+                order_moves(moves, self.pv[0] if self.pv else tt_move)
+            elif self.ordering is not None:
+                moves = self.ordering.order(game, moves, 0, tt_move)
+            else:
+                order_moves(moves, tt_move)
+
+            scores = dict()
             v = float("-inf")
-            for m in game.get_legal_moves():
-                v = self.min_value(game.forecast_move(m), depth - 1, alpha, beta)
+            for m in moves:
+                if self.in_place:
+                    game.push_move(m)
+                    try:
+                        v = self.search_child(game, depth, alpha, beta, not scores)
+                    finally:
+                        game.pop_move()
+                else:
+                    v = self.search_child(game.forecast_move(m), depth, alpha, beta, not scores)
+                scores[m] = v
+                best_score = max(best_score, v)
 
                 # update lower bound
                 if v > alpha:
@@ -622,9 +2018,257 @@ class AlphaBetaPlayer(IsolationPlayer):
 
                 # if maximum is already more than it can be then skip rest
                 if v >= beta:
+                    if self.stats is not None:
+                        self.stats.cutoff()
                     break
 
+            if self.tt is not None and best_move != (-1, -1) and all_moves:
+                tt_move = game.transform_move(best_move, sym) if sym else best_move
+                self.tt.store(key, depth, alpha, TranspositionTable.bound(alpha, alpha_orig, beta_orig), tt_move)
+
             # update upper bound
             self.beta = beta = v
+            self.root_scores = scores
 
-        return best_move
+        return best_move, best_score
+
+    def update_pv(self, game, depth):
+        """Rebuild the principal variation of a completed iteration by
+        following the best moves stored in the transposition table, so that
+        the next iteration searches it first even if entries get replaced.
+        """
+        self.pv = []
+        self.pv_moves = dict()
+        if self.tt is None:
+            return
+
+        board = game.copy()
+        for _ in range(depth):
+            key, sym = canonical_position(board, self)
+            entry = self.tt.probe(key)
+            if entry is None or entry[4] is None:
+                break
+            # pv_moves keeps the moves as stored, for the image keyed
+            move = board.transform_move(entry[4], sym, inverse=True) if sym else entry[4]
+            if not board.move_is_legal(move):
+                break
+            self.pv.append(move)
+            self.pv_moves[key] = entry[4]
+            board.apply_move(move)
+
+    def search_child(self, game, depth, alpha, beta, first):
+        """Return the score of a root child `game` searched `depth` - 1
+        plies deep in the (alpha, beta) window; `first` is True for the
+        first root move searched.
+        """
+        return self.min_value(game, depth - 1, alpha, beta)
+
+
+# Players searching in a worker process, keyed by the `_worker_key` of the
+# player they search for; each keeps its transposition table across moves
+_WORKER_PLAYERS = dict()
+
+
+def _start_worker(_):
+    """No-op task used to start the processes of a worker pool."""
+    return None
+
+
+def _search_share(key, config, board, slot, moves, deadline):
+    """Iterative deepening search of some of the root moves, run in a worker
+    process for `AlphaBetaPlayer.parallel_move()`.
+
+    Parameters
+    ----------
+    key : int
+        Key of the searching player in `_WORKER_PLAYERS`
+    config : (type, tuple, dict)
+        Class and constructor arguments of the searching player
+    board : isolation.Board
+        The position, with placeholders for the players
+    slot : int
+        0 if the searching player is player 1, 1 if it is player 2
+    moves : list<(int, int)>
+        The root moves to search
+    deadline : float
+        Time at which the search must have stopped, on the
+        `time.monotonic()` clock
+
+    Returns
+    -------
+    (list<((int, int), float)>, bool)
+        The best move and score at each completed depth, and whether the
+        last score is a proven win or loss
+    """
+    if time.monotonic() >= deadline:
+        # the task started too late, e.g. queued behind a previous move
+        return [], False
+
+    player = _WORKER_PLAYERS.get(key)
+    if player is None:
+        cls, args, kwargs = config
+        player = cls(*args, **kwargs)
+        player.TIMER_THRESHOLD = 0.
+        _WORKER_PLAYERS[key] = player
+
+    opponent = object()
+    if slot == 0:
+        board = board.copy_with_players(player, opponent)
+    else:
+        board = board.copy_with_players(opponent, player)
+
+    player.begin_move(board, lambda: 1000 * (deadline - time.monotonic()))
+    if player.ordering is not None:
+        player.ordering.new_move()
+    player.root_scores = dict()
+    player.pv = []
+    player.pv_moves = dict()
+
+    results = []
+    try:
+        depth = 1
+        while True:
+            move, score = player.search_root(board, depth, moves=moves)
+            results.append((move, score))
+            if math.isinf(score):
+                return results, True
+            player.update_pv(board, depth)
+            depth += 1
+    except SearchTimeout:
+        pass
+    finally:
+        player.clear_deadline()
+    return results, False
+
+
+class PVSPlayer(AlphaBetaPlayer):
+    """Game-playing agent that chooses a move using iterative deepening
+    Principal Variation Search (NegaScout), a negamax form of alpha-beta.
+
+    The first move of every node is searched with the full window; the
+    others with a null window around alpha, which only tells whether they
+    beat the first move, and are searched again with the full window when
+    they do. With good move ordering the first move is usually the best
+    one, and the null-window searches cut more nodes than a full window.
+
+    Every node value is seen from the player to move; `score_fn` keeps the
+    usual convention (the score for this player) and is negated at the
+    opponent's nodes. The transposition table of a PVSPlayer holds values
+    in the negamax convention. The constructor takes the same arguments as
+    `AlphaBetaPlayer`.
+    """
+
+    def search_child(self, game, depth, alpha, beta, first):
+        if first or math.isinf(alpha):
+            return -self.pvs(game, depth - 1, -beta, -alpha)
+        v = -self.pvs(game, depth - 1, -alpha - NULL_WINDOW, -alpha)
+        if alpha < v < beta:
+            v = -self.pvs(game, depth - 1, -beta, -v)
+        return v
+
+    def pvs(self, game, depth, alpha, beta):
+        """Fail-soft principal variation search of a position.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search from this point
+        alpha : float
+            Lower bound of the window, for the player to move
+        beta : float
+            Upper bound of the window, for the player to move
+
+        Returns
+        -------
+        float
+            The value of the position for the player to move; an upper
+            bound if it is at most alpha, a lower bound if it is at least
+            beta
+        """
+        color = 1 if game.active_player == self else -1
+
+        stats = self.stats
+        if stats is not None:
+            stats.node()
+
+        if self.terminal_test(game, depth):
+            if stats is not None:
+                stats.evaluation()
+            return color * self.score(game, self)
+
+        if self.tablebase is not None:
+            value = self.tablebase.score(game, self)
+            if value is not None:
+                return color * value
+
+        moves = game.get_legal_moves()
+        tt_move = None
+        if self.tt is not None:
+            key, sym = canonical_position(game, self)
+            value, tt_move = self.tt.lookup(key, depth, alpha, beta)
+            if value is not None:
+                if stats is not None:
+                    stats.tt_hit()
+                return value
+            if tt_move is None and self.pv_moves:
+                tt_move = self.pv_moves.get(key)
+            if sym and tt_move is not None:
+                tt_move = game.transform_move(tt_move, sym, inverse=True)
+            alpha_orig, beta_orig = alpha, beta
+
+        if self.ordering is not None:
+            ply = self.root_depth - depth
+            moves = self.ordering.order(game, moves, ply, tt_move)
+        else:
+            order_moves(moves, tt_move)
+
+        v = float("-inf")
+        best_move = None
+        if self.batch_score is not None and depth == 1:
+            # frontier node: score all the children in a single call
+            values = [color * value for value in self.batch_score(game, moves, self)]
+            if stats is not None:
+                stats.evaluation(len(values))
+            v = max(values)
+            best_move = moves[values.index(v)]
+        else:
+            for m in moves:
+                child = game
+                if self.in_place:
+                    game.push_move(m)
+                else:
+                    child = game.forecast_move(m)
+                try:
+                    if best_move is None or math.isinf(alpha):
+                        child_v = -self.pvs(child, depth - 1, -beta, -alpha)
+                    else:
+                        # null window: does the move beat alpha at all?
+                        child_v = -self.pvs(child, depth - 1, -alpha - NULL_WINDOW, -alpha)
+                        if alpha < child_v < beta:
+                            child_v = -self.pvs(child, depth - 1, -beta, -child_v)
+                finally:
+                    if self.in_place:
+                        game.pop_move()
+
+                if best_move is None or child_v > v:
+                    v = child_v
+                    best_move = m
+
+                alpha = max(alpha, v)
+                if alpha >= beta:
+                    if self.ordering is not None:
+                        self.ordering.record_cutoff(m, ply, depth)
+                    if stats is not None:
+                        stats.cutoff()
+                    break
+
+        if self.tt is not None:
+            if sym and best_move is not None:
+                best_move = game.transform_move(best_move, sym)
+            self.tt.store(key, depth, v, TranspositionTable.bound(v, alpha_orig, beta_orig), best_move)
+
+        return v
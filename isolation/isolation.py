@@ -9,10 +9,144 @@ be available to project reviewers.
 """
 import random
 import timeit
-from copy import copy
+from collections import namedtuple
+from contextlib import contextmanager
 
 TIME_LIMIT_MILLIS = 150
 
+# Seed for the Zobrist keys, fixed so that position hashes are reproducible
+# across processes and runs
+ZOBRIST_SEED = 0x150
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+BoardTables = namedtuple("BoardTables", ["coords", "attack_masks", "full_mask",
+                                         "neighbor_indices", "neighbor_moves", "knight_shifts",
+                                         "zobrist_blocked", "zobrist_location",
+                                         "zobrist_side", "symmetries", "inverse_symmetries",
+                                         "symmetric_zobrist"])
+
+# Per-size tables shared by every board with the same dimensions, keyed by
+# (width, height); see `board_tables()`
+_BOARD_TABLES = dict()
+
+
+def board_tables(width, height):
+    """Return the precomputed `BoardTables` for a board size.
+
+    Squares are indexed column-major (`idx = row + col * height`) to match the
+    layout used by the original list-backed board.
+
+    coords : list<(int, int)>
+        The (row, col) pair of each square index.
+    attack_masks : list<int>
+        Bitmask of every square a knight can reach from each square index.
+    full_mask : int
+        Bitmask with one bit set for every square of the board.
+    neighbor_indices : list<list<int>>
+        Square indices a knight can reach from each square index.
+    neighbor_moves : list<list<(int, int)>>
+        The same squares as (row, col) pairs.
+    knight_shifts : list<(int, int)>
+        One (shift, source_mask) pair per knight direction: shifting the
+        squares of a bitboard that are in `source_mask` by `shift` bits moves
+        them one knight jump in that direction without leaving the board.
+    zobrist_blocked, zobrist_location, zobrist_side
+        Random 64-bit keys for a blocked square, for player 1 / player 2
+        standing on a square (`zobrist_location[slot][idx]`), and for player 2
+        holding initiative.
+    symmetries : list<list<int>>
+        The symmetries of the board as permutations of the square indices:
+        `symmetries[sym][idx]` is the square `idx` is mapped to. The identity
+        comes first. A square board has the eight rotations and reflections,
+        a rectangular one the four that keep its shape; knight moves are
+        preserved by all of them.
+    inverse_symmetries : list<list<int>>
+        The inverse permutation of each symmetry.
+    symmetric_zobrist : list<(list<int>, list<list<int>>)>
+        For each symmetry, `zobrist_blocked` and `zobrist_location` indexed
+        by the squares before the permutation, so that the key of the image
+        of a position is computed without permuting it first.
+    """
+    key = (width, height)
+    tables = _BOARD_TABLES.get(key)
+    if tables is None:
+        coords = [(idx % height, idx // height) for idx in range(width * height)]
+        neighbor_indices = [[r + dr + (c + dc) * height for dr, dc in DIRECTIONS
+                             if 0 <= r + dr < height and 0 <= c + dc < width]
+                            for r, c in coords]
+        attack_masks = [sum(1 << idx for idx in neighbors) for neighbors in neighbor_indices]
+        rng = random.Random(ZOBRIST_SEED ^ (width << 16) ^ height)
+        size = width * height
+        zobrist_blocked = [rng.getrandbits(64) for _ in range(size)]
+        zobrist_location = [[rng.getrandbits(64) for _ in range(size)] for _ in range(2)]
+        symmetries = _symmetries(width, height)
+        tables = BoardTables(
+            coords=coords,
+            attack_masks=attack_masks,
+            full_mask=(1 << size) - 1,
+            neighbor_indices=neighbor_indices,
+            neighbor_moves=[[coords[idx] for idx in neighbors] for neighbors in neighbor_indices],
+            knight_shifts=[(dr + dc * height,
+                            sum(1 << idx for idx, (r, c) in enumerate(coords)
+                                if 0 <= r + dr < height and 0 <= c + dc < width))
+                           for dr, dc in DIRECTIONS],
+            zobrist_blocked=zobrist_blocked,
+            zobrist_location=zobrist_location,
+            zobrist_side=rng.getrandbits(64),
+            symmetries=symmetries,
+            inverse_symmetries=[[perm.index(idx) for idx in range(size)] for perm in symmetries],
+            symmetric_zobrist=[([zobrist_blocked[perm[idx]] for idx in range(size)],
+                                [[keys[perm[idx]] for idx in range(size)]
+                                 for keys in zobrist_location])
+                               for perm in symmetries])
+        _BOARD_TABLES[key] = tables
+    return tables
+
+
+def _symmetries(width, height):
+    """Return the square permutations of the symmetries of a board; see
+    `board_tables()`.
+    """
+    h, w = height - 1, width - 1
+    transforms = [lambda r, c: (r, c), lambda r, c: (h - r, w - c),
+                  lambda r, c: (h - r, c), lambda r, c: (r, w - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r), lambda r, c: (w - c, h - r),
+                       lambda r, c: (c, h - r), lambda r, c: (w - c, r)]
+    return [[r + c * height for r, c in (transform(idx % height, idx // height)
+                                         for idx in range(width * height))]
+            for transform in transforms]
+
+
+def knight_attacks(tables, squares):
+    """Return the bitmask of every square one knight jump away from any of
+    the squares set in the `squares` bitmask.
+    """
+    attacks = 0
+    for shift, source_mask in tables.knight_shifts:
+        if shift > 0:
+            attacks |= (squares & source_mask) << shift
+        else:
+            attacks |= (squares & source_mask) >> -shift
+    return attacks
+
+
+def knight_reach(tables, squares, open_mask, steps):
+    """Flood fill over open squares: return the bitmask of squares of
+    `open_mask` that a knight starting on any square of `squares` reaches in
+    1 to `steps` jumps, landing only on open squares.
+    """
+    reached = 0
+    frontier = squares
+    for _ in range(steps):
+        frontier = knight_attacks(tables, frontier) & open_mask & ~reached
+        if not frontier:
+            break
+        reached |= frontier
+    return reached
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,27 +167,114 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    shuffle : bool (optional)
+        Whether the legal moves of a placed player are returned in random
+        order. With False they always come in the same canonical order, which
+        makes searches reproducible and skips the shuffle on every call.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    # Boards are created at every node of a search: slots keep them small
+    # and quick to build, see copy()
+    __slots__ = ("width", "height", "shuffle", "move_count", "_player_1", "_player_2",
+                 "_active_player", "_inactive_player", "_tables", "_coords", "_attack_masks",
+                 "_neighbor_indices", "_full_mask", "_blocked", "_locations", "_zobrist",
+                 "_undo_stack")
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle=True):
         self.width = width
         self.height = height
+        self.shuffle = shuffle
         self.move_count = 0
         self._player_1 = player_1
         self._player_2 = player_2
         self._active_player = player_1
         self._inactive_player = player_2
 
-        # The last 3 entries of the board state includes initiative (0 for
-        # player 1, 1 for player 2) player 2 last move, and player 1 last move
-        self._board_state = [Board.BLANK] * (width * height + 3)
-        self._board_state[-1] = Board.NOT_MOVED
-        self._board_state[-2] = Board.NOT_MOVED
+        # The board is kept as a bitboard: bit `idx` of `_blocked` is set once
+        # the square has been occupied, and `_locations` holds the square
+        # index of player 1 and player 2 (NOT_MOVED until they are placed).
+        # The player holding initiative is player 1 on even move counts.
+        # `_zobrist` is the Zobrist key of the position, kept up to date by
+        # apply_move().
+        self._tables = board_tables(width, height)
+        self._coords = self._tables.coords
+        self._attack_masks = self._tables.attack_masks
+        self._neighbor_indices = self._tables.neighbor_indices
+        self._full_mask = self._tables.full_mask
+        self._blocked = 0
+        self._locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._zobrist = 0
+
+        # Undo records of the moves made with push_move(), most recent last;
+        # created by the first push_move()
+        self._undo_stack = None
 
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist key of the current state. The key covers the
+        blocked cells, both player locations and the player with initiative.
+        """
+        return self._zobrist
+
+    def canonical_hash(self):
+        """Return the key of the current state shared by all its symmetric
+        images (see `board_tables()`): the smallest Zobrist key among the
+        images.
+
+        Returns
+        -------
+        (int, int)
+            The key, and the index of the symmetry mapping the state to the
+            image the key belongs to; `transform_move()` maps moves between
+            the two.
+        """
+        tables = self._tables
+        side = tables.zobrist_side if self.move_count & 1 else 0
+        squares = []
+        blocked = self._blocked
+        while blocked:
+            bit = blocked & -blocked
+            squares.append(bit.bit_length() - 1)
+            blocked ^= bit
+
+        best_key, best_sym = self._zobrist, 0
+        for sym in range(1, len(tables.symmetries)):
+            blocked_keys, location_keys = tables.symmetric_zobrist[sym]
+            key = side
+            for idx in squares:
+                key ^= blocked_keys[idx]
+            for slot, idx in enumerate(self._locations):
+                if idx != Board.NOT_MOVED:
+                    key ^= location_keys[slot][idx]
+            if key < best_key:
+                best_key, best_sym = key, sym
+        return best_key, best_sym
+
+    def transform_move(self, move, sym, inverse=False):
+        """Map a move of the current state to the same move in its image by
+        symmetry `sym`, or back from the image with `inverse`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column)
+
+        sym : int
+            Index of the symmetry, e.g. as returned by `canonical_hash()`
+
+        inverse : bool (optional)
+            Map the move from the image back to the current state instead
+
+        Returns
+        -------
+        (int, int)
+            The mapped coordinate pair
+        """
+        tables = self._tables
+        perm = tables.inverse_symmetries[sym] if inverse else tables.symmetries[sym]
+        return tables.coords[perm[move[0] + move[1] * self.height]]
 
     @property
     def active_player(self):
@@ -92,11 +313,40 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        # skip __init__: only the player locations are mutable, the per-size
+        # tables are shared by every board of the same size
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.shuffle = self.shuffle
         new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
-        new_board._board_state = copy(self._board_state)
+        new_board._tables = self._tables
+        new_board._coords = self._coords
+        new_board._attack_masks = self._attack_masks
+        new_board._neighbor_indices = self._neighbor_indices
+        new_board._full_mask = self._full_mask
+        new_board._blocked = self._blocked
+        new_board._locations = self._locations[:]
+        new_board._zobrist = self._zobrist
+        new_board._undo_stack = None
+        return new_board
+
+    def copy_with_players(self, player_1, player_2):
+        """Return a copy of the current board with other objects registered
+        as player 1 and player 2, e.g. to hand the position to a search
+        running in another process.
+        """
+        new_board = self.copy()
+        new_board._player_1 = player_1
+        new_board._player_2 = player_2
+        if self.move_count % 2 == 0:
+            new_board._active_player, new_board._inactive_player = player_1, player_2
+        else:
+            new_board._active_player, new_board._inactive_player = player_2, player_1
         return new_board
 
     def forecast_move(self, move):
@@ -132,15 +382,27 @@ class Board(object):
         bool
             Returns True if the move is legal, False otherwise
         """
-        idx = move[0] + move[1] * self.height
         return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
-                self._board_state[idx] == Board.BLANK)
+                not self._blocked >> (move[0] + move[1] * self.height) & 1)
 
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        blocked = self._blocked
+        return [move for idx, move in enumerate(self._coords)
+                if not blocked >> idx & 1]
+
+    def bitboard(self):
+        """Return the bitmask of the blocked squares, bit `row + col * height`
+        standing for square (row, col).
+        """
+        return self._blocked
+
+    def locations(self):
+        """Return the square index (`row + col * height`) of player 1 and of
+        player 2, NOT_MOVED for a player that has not been placed yet.
+        """
+        return tuple(self._locations)
 
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
@@ -157,19 +419,15 @@ class Board(object):
             if the player has not moved.
         """
         if player == self._player_1:
-            if self._board_state[-1] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-1]
+            idx = self._locations[0]
         elif player == self._player_2:
-            if self._board_state[-2] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-2]
+            idx = self._locations[1]
         else:
             raise RuntimeError(
                 "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coords[idx]
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -190,6 +448,54 @@ class Board(object):
             player = self.active_player
         return self.__get_moves(self.get_player_location(player))
 
+    def reach_count(self, loc, steps=2):
+        """Count the blank squares a knight standing on `loc` can reach in
+        1 to `steps` moves, landing only on blank squares.
+
+        Parameters
+        ----------
+        loc : (int, int) or None
+            A coordinate pair (row, column), or NOT_MOVED for a player that
+            has not been placed yet and can reach every blank square.
+
+        steps : int (optional)
+            Maximum number of knight moves.
+
+        Returns
+        -------
+        int
+            The number of reachable blank squares
+        """
+        return bin(self.reach_mask(loc, steps)).count("1")
+
+    def reach_mask(self, loc, steps=None):
+        """Return the bitmask (bit `row + col * height`) of the blank squares
+        a knight standing on `loc` can reach in 1 to `steps` moves, landing
+        only on blank squares.
+
+        Parameters
+        ----------
+        loc : (int, int) or None
+            A coordinate pair (row, column), or NOT_MOVED for a player that
+            has not been placed yet and can reach every blank square.
+
+        steps : int (optional)
+            Maximum number of knight moves; None for any number, i.e. the
+            region of the board the knight can still reach.
+
+        Returns
+        -------
+        int
+            The bitmask of the reachable blank squares
+        """
+        open_mask = self._full_mask & ~self._blocked
+        if loc == Board.NOT_MOVED:
+            return open_mask
+        if steps is None:
+            steps = len(self._coords)
+        start = 1 << (loc[0] + loc[1] * self.height)
+        return knight_reach(self._tables, start, open_mask, steps)
+
     def apply_move(self, move):
         """Move the active player to a specified location.
 
@@ -200,20 +506,71 @@ class Board(object):
             the active player on the board.
         """
         idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
-        self._board_state[-last_move_idx] = idx
-        self._board_state[idx] = 1
-        self._board_state[-3] ^= 1
+        slot = self.move_count & 1
+        tables = self._tables
+        location_keys = tables.zobrist_location[slot]
+
+        key = self._zobrist ^ tables.zobrist_side ^ location_keys[idx]
+        vacated = self._locations[slot]
+        if vacated != Board.NOT_MOVED:
+            key ^= location_keys[vacated]
+        if not self._blocked >> idx & 1:
+            key ^= tables.zobrist_blocked[idx]
+        self._zobrist = key
+
+        self._locations[slot] = idx
+        self._blocked |= 1 << idx
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def push_move(self, move):
+        """Move the active player to a specified location in-place, saving
+        what is needed to take the move back with pop_move().
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        if self._undo_stack is None:
+            self._undo_stack = []
+        self._undo_stack.append((self._blocked, self._locations[self.move_count & 1],
+                                 self._zobrist))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Take back the last move made with push_move()."""
+        if not self._undo_stack:
+            raise RuntimeError("pop_move() called without a matching push_move()")
+        self._blocked, location, self._zobrist = self._undo_stack.pop()
+        self.move_count -= 1
+        self._locations[self.move_count & 1] = location
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+
+    @contextmanager
+    def moved(self, move):
+        """Context manager applying a move with push_move() and taking it
+        back with pop_move() on exit, including when an exception is raised.
+
+        Yields
+        ------
+        isolation.Board
+            This board with the move applied.
+        """
+        self.push_move(move)
+        try:
+            yield self
+        finally:
+            self.pop_move()
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self._has_moves()
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self._has_moves()
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,7 +594,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self._has_moves():
 
             if player == self._inactive_player:
                 return float("inf")
@@ -247,6 +604,15 @@ class Board(object):
 
         return 0.
 
+    def _has_moves(self):
+        """Test whether the active player has at least one legal move without
+        building the list of moves.
+        """
+        idx = self._locations[self.move_count & 1]
+        if idx == Board.NOT_MOVED:
+            return self._blocked != self._full_mask
+        return bool(self._attack_masks[idx] & ~self._blocked)
+
     def __get_moves(self, loc):
         """Generate the list of possible moves for an L-shaped motion (like a
         knight in chess).
@@ -254,12 +620,12 @@ class Board(object):
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        blocked = self._blocked
+        coords = self._coords
+        valid_moves = [coords[idx] for idx in self._neighbor_indices[loc[0] + loc[1] * self.height]
+                       if not blocked >> idx & 1]
+        if self.shuffle:
+            random.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -271,8 +637,8 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-        p1_loc = self._board_state[-1]
-        p2_loc = self._board_state[-2]
+        p1_loc = self._locations[0]
+        p2_loc = self._locations[1]
 
         col_margin = len(str(self.height - 1)) + 1
         prefix = "{:<" + "{}".format(col_margin) + "}"
@@ -282,7 +648,7 @@ class Board(object):
             out += prefix.format(i) + ' | '
             for j in range(self.width):
                 idx = i + j * self.height
-                if not self._board_state[idx]:
+                if not self._blocked >> idx & 1:
                     out += ' '
                 elif p1_loc == idx:
                     out += symbols[0]
@@ -0,0 +1,99 @@
+"""Build the opening book of `competition_agent.CustomPlayer`.
+
+The builder follows the games of both seats through their first plies: at
+the book player's turns it searches the position with `AlphaBetaPlayer` for
+a fixed time and follows the move found only, at the opponent's turns it
+follows every reply. Positions are stored once per class of symmetric
+positions, keyed by `competition_agent.canonical_key()`.
+
+    python opening_book.py --plies 4 --time 1000 --output data.json
+
+The output is the JSON file expected in the `data` slot of the PvP
+submission and as the `data` argument of `CustomPlayer`.
+"""
+import argparse
+import json
+import sys
+import timeit
+
+from isolation import Board
+from competition_agent import bitboard, canonical_key, symmetries
+from game_agent import AlphaBetaPlayer, custom_score
+
+PLIES = 4
+SEARCH_TIME = 1000.  # milliseconds of search per book position
+
+
+def search_move(game, player, time_limit):
+    """Search the position with `player` for `time_limit` milliseconds."""
+    start = timeit.default_timer()
+    return player.get_move(game, lambda: time_limit - 1000 * (timeit.default_timer() - start))
+
+
+def build_book(width=7, height=7, plies=PLIES, time_limit=SEARCH_TIME, score_fn=custom_score,
+               log=None):
+    """Build an opening book covering the first `plies` plies.
+
+    Returns
+    -------
+    dict
+        The book, in the format read by `competition_agent.OpeningBook`
+    """
+    moves = dict()
+    for seat in (0, 1):
+        player = AlphaBetaPlayer(score_fn=score_fn)
+        opponent = object()
+        board = Board(player, opponent, width, height) if seat == 0 else \
+            Board(opponent, player, width, height)
+        _expand(board, player, seat, plies, time_limit, moves, set(), log)
+    return {"width": width, "height": height, "plies": plies, "moves": moves}
+
+
+def _expand(board, player, seat, plies, time_limit, moves, seen, log):
+    if board.move_count >= plies:
+        return
+    blocked, locations, _ = bitboard(board)
+    key, sym = canonical_key(board.width, board.height, blocked, locations)
+    if key in seen:
+        return
+    seen.add(key)
+
+    legal_moves = board.get_legal_moves()
+    if not legal_moves:
+        return
+
+    if board.move_count % 2 != seat:
+        for move in legal_moves:
+            _expand(board.forecast_move(move), player, seat, plies, time_limit, moves, seen, log)
+        return
+
+    move = search_move(board, player, time_limit)
+    # store the move as played in the image the key describes
+    idx = symmetries(board.width, board.height)[sym][move[0] + move[1] * board.height]
+    moves[key] = [idx % board.height, idx // board.height]
+    if log is not None:
+        log("{:>6} positions  ply {}  {} -> {}".format(len(moves), board.move_count, key, move))
+    _expand(board.forecast_move(move), player, seat, plies, time_limit, moves, seen, log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the opening book of the competition agent.")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--plies", type=int, default=PLIES,
+                        help="number of plies covered by the book")
+    parser.add_argument("--time", type=float, default=SEARCH_TIME,
+                        help="milliseconds of search per book position")
+    parser.add_argument("--output", default="data.json", help="book file to write")
+    args = parser.parse_args(argv)
+
+    book = build_book(args.width, args.height, args.plies, args.time,
+                      log=lambda line: print(line, flush=True))
+    with open(args.output, "w") as f:
+        json.dump(book, f, separators=(",", ":"), sort_keys=True)
+    print("{} positions written to {}".format(len(book["moves"]), args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Batched self-play: play thousands of independent games in lockstep with
+NumPy.
+
+`Board.play()` runs one game at a time and times every move. `simulate()`
+keeps the state of all the games in arrays instead (an (G, N) bool array
+of the blank squares and a (G, 2) array of the player squares) and plays
+one ply of every running game per step: the legal moves of all the games
+come from a single lookup in the knight adjacency table of `batch_eval`,
+and a policy picks one move per game from the stacked legal move masks.
+
+    result = simulate(10000, greedy_policy, random_policy, seed=0)
+    result.winners.mean()  # share of the games won by player 2
+
+Policies are functions `policy(state) -> squares` taking a `PolicyState`
+and returning the square index played in each game. `random_policy`,
+`greedy_policy` (greedy by `sample_players.open_move_score`) and
+`improved_policy` (greedy by `sample_players.improved_score`) are
+provided; the greedy ones break ties at random rather than by move order
+like `sample_players.GreedyPlayer`.
+
+Games are returned as compact move histories, one row of square indices
+(`row + col * height`) per game; `game_moves()` turns a row back into
+(row, column) moves to replay it on a `Board`.
+"""
+import argparse
+import sys
+import timeit
+from collections import namedtuple
+
+import numpy as np
+
+from batch_eval import knight_tables
+
+PolicyState = namedtuple("PolicyState", ["open", "mover_pos", "other_pos", "legal",
+                                         "adjacency", "rng"])
+PolicyState.__doc__ = """State of the running games handed to a policy.
+
+open : np.ndarray of bool, shape (G, N)
+    Blank squares of each game
+mover_pos, other_pos : np.ndarray of int, shape (G,)
+    Square of the player to move and of its opponent (N while not placed)
+legal : np.ndarray of bool, shape (G, N)
+    Legal moves of the player to move; every game has at least one
+adjacency : np.ndarray of bool, shape (N + 1, N)
+    Knight adjacency table of the board, see `batch_eval.knight_tables()`
+rng : np.random.Generator
+    Random generator of the simulation
+"""
+
+SimulationResult = namedtuple("SimulationResult", ["moves", "lengths", "winners"])
+SimulationResult.__doc__ = """Outcome of a batch of games.
+
+moves : np.ndarray of int, shape (G, N)
+    Square played at each ply of each game, -1 after the end of the game
+lengths : np.ndarray of int, shape (G,)
+    Number of plies of each game
+winners : np.ndarray of int, shape (G,)
+    0 if player 1 won the game, 1 if player 2 did
+"""
+
+
+def random_policy(state):
+    """Play a uniformly random legal move."""
+    keys = state.rng.random(state.legal.shape)
+    keys[~state.legal] = -1.
+    return keys.argmax(axis=1)
+
+
+def _greedy_move(state, scores):
+    """Play the legal move with the highest score, ties broken at random.
+    Moves that leave the opponent without a move score +inf, as
+    `Board.is_winner()` makes the scalar heuristics do.
+    """
+    other_moves = (state.adjacency[state.other_pos] & state.open).sum(axis=1)
+    # the square played is no longer open to the opponent
+    other_moves = other_moves[:, None] - state.adjacency[state.other_pos]
+    scores = scores.astype(float)
+    scores[other_moves == 0] = np.inf
+    # scores are whole numbers: the noise only orders equal scores
+    scores += state.rng.random(scores.shape) * 0.5
+    scores[~state.legal] = -np.inf
+    return scores.argmax(axis=1)
+
+
+def _own_moves(state):
+    """Number of moves the player to move would have after each move."""
+    step = state.adjacency[:-1].astype(np.float32)
+    return state.open.astype(np.float32) @ step.T
+
+
+def greedy_policy(state):
+    """Play the move maximizing `sample_players.open_move_score`."""
+    return _greedy_move(state, _own_moves(state))
+
+
+def improved_policy(state):
+    """Play the move maximizing `sample_players.improved_score`."""
+    other_moves = (state.adjacency[state.other_pos] & state.open).sum(axis=1)
+    other_moves = other_moves[:, None] - state.adjacency[state.other_pos]
+    return _greedy_move(state, _own_moves(state) - other_moves)
+
+
+POLICIES = {"random": random_policy, "greedy": greedy_policy, "improved": improved_policy}
+
+
+def simulate(num_games, player_1=random_policy, player_2=random_policy, width=7, height=7,
+             seed=None):
+    """Play `num_games` games between two policies.
+
+    Parameters
+    ----------
+    num_games : int
+        Number of games played in lockstep
+
+    player_1, player_2 : callable (optional)
+        The policy of each player
+
+    width, height : int (optional)
+        Dimensions of the board
+
+    seed : int (optional)
+        Seed of the random generator handed to the policies
+
+    Returns
+    -------
+    SimulationResult
+    """
+    tables = knight_tables(width, height)
+    adjacency = tables.adjacency
+    size = width * height
+    rng = np.random.default_rng(seed)
+
+    open_squares = np.ones((num_games, size), dtype=bool)
+    positions = np.full((num_games, 2), size, dtype=np.intp)
+    moves = np.full((num_games, size), -1, dtype=np.int8 if size < 128 else np.int16)
+    lengths = np.zeros(num_games, dtype=np.int16)
+    winners = np.zeros(num_games, dtype=np.int8)
+    running = np.arange(num_games)
+    policies = (player_1, player_2)
+
+    for ply in range(size + 1):
+        mover = ply & 1
+        legal = adjacency[positions[running, mover]] & open_squares[running]
+        stuck = ~legal.any(axis=1)
+        if stuck.any():
+            winners[running[stuck]] = 1 - mover
+            running, legal = running[~stuck], legal[~stuck]
+        if not len(running):
+            break
+
+        state = PolicyState(open_squares[running], positions[running, mover],
+                            positions[running, 1 - mover], legal, adjacency, rng)
+        squares = policies[mover](state)
+        open_squares[running, squares] = False
+        positions[running, mover] = squares
+        moves[running, ply] = squares
+        lengths[running] = ply + 1
+
+    return SimulationResult(moves, lengths, winners)
+
+
+def game_moves(result, game, height=7):
+    """Return the moves of one game of a result as (row, column) pairs."""
+    return [(int(idx) % height, int(idx) // height)
+            for idx in result.moves[game, :result.lengths[game]]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play batches of self-play games.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--player-1", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--player-2", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="write the move histories to this .npz file")
+    args = parser.parse_args(argv)
+
+    start = timeit.default_timer()
+    result = simulate(args.games, POLICIES[args.player_1], POLICIES[args.player_2],
+                      args.width, args.height, args.seed)
+    elapsed = timeit.default_timer() - start
+    print("{} games in {:.2f}s ({:.0f} games/s), player 1 won {:.1%}, mean length {:.1f} plies"
+          .format(args.games, elapsed, args.games / elapsed, 1 - result.winners.mean(),
+                  result.lengths.mean()))
+    if args.output:
+        np.savez_compressed(args.output, **result._asdict())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
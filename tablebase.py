@@ -0,0 +1,275 @@
+"""Exact endgame tablebase of the positions with few blank squares left.
+
+Late in a game the value of a position only depends on the set of blank
+squares and, for each player, on which of them it can jump to. `build()`
+enumerates, for every set of at most K blank squares of a board size, every
+pair of such neighbor subsets, and solves them by retrograde analysis: the
+tables of the sets of k blank squares are computed from those of k - 1
+squares, one NumPy pass per blank square the mover may jump to. The result
+is written to a binary file that `Tablebase` memory-maps and probes in
+constant time without NumPy:
+
+    python tablebase.py --width 7 --height 7 --blanks 4 --time 600 --output tb7x7.bin
+
+A probe gives the game-theoretic value for the player to move and the
+number of plies left until the game ends with best play (the winner ends
+the game as soon as it can, the loser holds out as long as it can). Search
+agents use it through the `tablebase` argument of `game_agent.IsolationPlayer`,
+and `game_agent.custom_score` through `game_agent.TABLEBASE`.
+
+File layout: a `HEADER` (magic, width, height, K) followed by the tables
+of k = 0..K blank squares. The table of k squares holds one block of 4 ** k
+bytes per set of k blank squares, in the order of the combinatorial number
+system rank of the set (see `rank()`); inside a block, the byte at
+`(A << k) | O` is the value of the position where the player to move can
+jump to the blank squares in bitmask A and the other player to those in O,
+bit j standing for the j-th blank square by square index. A value byte is
+`(distance << 1) | win`.
+"""
+import argparse
+import itertools
+import math
+import mmap
+import struct
+import sys
+import timeit
+
+import numpy as np
+
+from isolation import board_tables
+
+HEADER = struct.Struct("<8sHHH6x")
+MAGIC = b"ISOTBL01"
+
+MAX_BLANKS = 4
+BUILD_TIME = 600.  # seconds
+
+# Number of blank square sets solved per NumPy pass, bounding the memory
+# used by the build
+CHUNK_SIZE = 2 ** 14
+
+
+def level_size(size, blanks):
+    """Number of bytes of the table of the positions with `blanks` blank
+    squares on a board of `size` squares.
+    """
+    return math.comb(size, blanks) * 4 ** blanks
+
+
+def rank(squares):
+    """Rank of a sorted list of square indices among the sets of the same
+    size, in the combinatorial number system.
+    """
+    return sum(math.comb(square, j + 1) for j, square in enumerate(squares))
+
+
+def _adjacency(width, height):
+    size = width * height
+    adjacency = np.zeros((size, size), dtype=np.int64)
+    for idx, neighbors in enumerate(board_tables(width, height).neighbor_indices):
+        adjacency[idx, neighbors] = 1
+    return adjacency
+
+
+def _solve_level(width, height, blanks, previous):
+    """Solve the positions with `blanks` blank squares from the table of
+    `blanks` - 1 squares; return the table as an array of shape
+    (sets, 4 ** blanks).
+    """
+    size = width * height
+    adjacency = _adjacency(width, height)
+    binom = np.array([[math.comb(n, j) for j in range(blanks + 1)] for n in range(size)],
+                     dtype=np.int64)
+    subsets = np.arange(2 ** blanks)
+    table = np.zeros((math.comb(size, blanks), 4 ** blanks), dtype=np.uint8)
+
+    combos = itertools.combinations(range(size), blanks)
+    while True:
+        squares = np.array(list(itertools.islice(combos, CHUNK_SIZE)), dtype=np.int64)
+        if not len(squares):
+            break
+        squares = squares.reshape(len(squares), blanks)
+        # mover scores: a win in d plies scores 256 - d, a loss in d plies
+        # scores d; a player without any move loses at once
+        scores = np.zeros((len(squares), 2 ** blanks, 2 ** blanks), dtype=np.int16)
+        zeros = np.zeros(len(squares), dtype=np.int64)
+        for i in range(blanks):
+            rest = np.delete(squares, i, axis=1)
+            child_rank = sum((binom[rest[:, j], j + 1] for j in range(blanks - 1)), zeros)
+            # squares the mover can jump to after moving to square i
+            mover_mask = sum((adjacency[squares[:, i], rest[:, j]] << j
+                              for j in range(blanks - 1)), zeros)
+            # squares the other player can still jump to, without square i
+            other_mask = (subsets & ((1 << i) - 1)) | ((subsets >> (i + 1)) << i)
+            child = previous[child_rank[:, None], (other_mask[None, :] << (blanks - 1)) |
+                             mover_mask[:, None]].astype(np.int16)
+            plies = (child >> 1) + 1
+            move_scores = np.where(child & 1, plies, 256 - plies)
+            movers = subsets[(subsets >> i) & 1 == 1]
+            scores[:, movers, :] = np.maximum(scores[:, movers, :], move_scores[:, None, :])
+
+        values = np.where(scores >= 128, ((256 - scores) << 1) | 1, scores << 1)
+        ranks = sum(binom[squares[:, j], j + 1] for j in range(blanks))
+        table[ranks] = values.reshape(len(squares), -1)
+    return table
+
+
+def build(filename, width=7, height=7, max_blanks=MAX_BLANKS, time_limit=BUILD_TIME, log=None):
+    """Build the tablebase of a board size into `filename`.
+
+    Tables are built for 0, 1, 2... blank squares up to `max_blanks`. A
+    table is not started if the time it is expected to take, extrapolated
+    from the previous one, would exceed `time_limit` seconds; the file then
+    covers fewer blank squares.
+
+    Returns
+    -------
+    int
+        The number of blank squares covered by the file
+    """
+    start = timeit.default_timer()
+    size = width * height
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, 0))
+        previous = np.zeros((1, 1), dtype=np.uint8)
+        f.write(previous.tobytes())
+        blanks, last_time = 0, 0.
+        while blanks < min(max_blanks, size):
+            elapsed = timeit.default_timer() - start
+            growth = level_size(size, blanks + 1) / level_size(size, blanks)
+            if elapsed + last_time * growth > time_limit:
+                break
+            level_start = timeit.default_timer()
+            previous = _solve_level(width, height, blanks + 1, previous)
+            f.write(previous.tobytes())
+            blanks += 1
+            last_time = timeit.default_timer() - level_start
+            if log is not None:
+                log("{} blank squares: {} positions in {:.1f}s".format(
+                    blanks, previous.size, last_time))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, width, height, blanks))
+    return blanks
+
+
+class Tablebase:
+    """Read-only view of a tablebase file built by `build()`.
+
+    Parameters
+    ----------
+    filename : str
+        The tablebase file; it is memory-mapped, not read into memory.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.max_blanks = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            raise ValueError("Not a tablebase file: {}".format(filename))
+        size = self.width * self.height
+        self._offsets = [HEADER.size]
+        for blanks in range(self.max_blanks):
+            self._offsets.append(self._offsets[-1] + level_size(size, blanks))
+        self._neighbors = [set(neighbors) for neighbors in
+                           board_tables(self.width, self.height).neighbor_indices]
+
+    def __getstate__(self):
+        # the file is mapped again by the process receiving a copy
+        return self.filename
+
+    def __setstate__(self, filename):
+        self.__init__(filename)
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def probe(self, game):
+        """Look up the exact value of a position.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The position to look up
+
+        Returns
+        -------
+        (bool, int) or None
+            Whether the player to move wins, and the number of plies left
+            until the end of the game with best play; None if the position
+            is not covered (other board size, too many blank squares or a
+            player not placed yet).
+        """
+        size = self.width * self.height
+        if (game.width, game.height) != (self.width, self.height) or \
+                size - game.move_count > self.max_blanks:
+            return None
+        own_loc = game.get_player_location(game.active_player)
+        opp_loc = game.get_player_location(game.inactive_player)
+        if own_loc is None or opp_loc is None:
+            return None
+
+        height = self.height
+        squares = [row + col * height for row, col in game.get_blank_spaces()]
+        own = self._neighbors[own_loc[0] + own_loc[1] * height]
+        opp = self._neighbors[opp_loc[0] + opp_loc[1] * height]
+        own_mask = opp_mask = 0
+        for j, square in enumerate(squares):
+            if square in own:
+                own_mask |= 1 << j
+            if square in opp:
+                opp_mask |= 1 << j
+
+        blanks = len(squares)
+        value = self._data[self._offsets[blanks] + rank(squares) * 4 ** blanks +
+                           ((own_mask << blanks) | opp_mask)]
+        return bool(value & 1), value >> 1
+
+    def score(self, game, player):
+        """Return inf / -inf if `player` wins / loses the position with best
+        play, or None if the position is not covered.
+        """
+        value = self.probe(game)
+        if value is None:
+            return None
+        if value[0] == (player == game.active_player):
+            return float("inf")
+        return float("-inf")
+
+    def best_move(self, game):
+        """Return the move of the player to move with the best value: the
+        fastest win if any, else the slowest loss. None if the position is
+        not covered or there are no legal moves.
+        """
+        if self.probe(game) is None:
+            return None
+        best_move, best_key = None, None
+        for move in game.get_legal_moves():
+            win, plies = self.probe(game.forecast_move(move))
+            key = (not win, -plies if not win else plies)
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an exact endgame tablebase.")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--blanks", type=int, default=MAX_BLANKS,
+                        help="maximum number of blank squares of the positions covered")
+    parser.add_argument("--time", type=float, default=BUILD_TIME,
+                        help="build time limit in seconds")
+    parser.add_argument("--output", default="tablebase.bin", help="tablebase file to write")
+    args = parser.parse_args(argv)
+
+    blanks = build(args.output, args.width, args.height, args.blanks, args.time,
+                   log=lambda line: print(line, flush=True))
+    print("positions with up to {} blank squares written to {}".format(blanks, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
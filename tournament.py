@@ -11,17 +11,21 @@ players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
 """
+import argparse
 import itertools
+import os
 import random
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
+from competition_agent import CustomPlayer
 from isolation import Board
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
-from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
-                        custom_score_2, custom_score_3)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, PVSPlayer, SearchStats,
+                        custom_score, custom_score_2, custom_score_3, summarize_moves)
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -31,35 +35,79 @@ This script evaluates the performance of the custom_score evaluation
 function against a baseline agent using alpha-beta search and iterative
 deepening (ID) called `AB_Improved`. The three `AB_Custom` agents use
 ID and alpha-beta search with the custom_score functions defined in
-game_agent.py.
+game_agent.py, and `PVS_Custom` uses ID and principal variation search
+with custom_score. `MCTS` is the Monte Carlo Tree Search agent of
+competition_agent.py, given the same timer threshold as the other agents.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+def play_game(task):
+    """Play a single game from its opening moves and return the index (0 or 1)
+    of the winning player, the termination reason and the search statistics
+    the two players collected during the game (None for a player without a
+    `stats` collector).
+
+    This is the unit of work sent to the worker processes: each worker plays
+    one game at a time, so the agents get the same `TIME_LIMIT` budget as in
+    a serial run.
+    """
+    player_1, player_2, opening, seed = task
+    random.seed(seed)
+    collectors = [getattr(player, "stats", None) for player in (player_1, player_2)]
+    for stats in collectors:
+        if stats is not None:
+            stats.clear()
+    game = Board(player_1, player_2)
+    for move in opening:
+        game.apply_move(move)
+    winner, _, termination = game.play(time_limit=TIME_LIMIT)
+    records = [None if stats is None else stats.moves for stats in collectors]
+    return int(winner is player_2), termination, records
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, executor=None, rng=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+
+    The openings and the seed of every game are drawn from `rng`, a
+    `random.Random` kept apart from the generator the agents use, so that
+    they do not depend on the moves played. When an executor is given every
+    game is played in a worker process, and the results are tallied in the
+    same way.
     """
+    if rng is None:
+        rng = random.Random()
     timeout_count = 0
     forfeit_count = 0
+    tasks = []
+    pairs = sum([[(cpu_agent.player, agent.player), (agent.player, cpu_agent.player)]
+                 for agent in test_agents], [])
     for _ in range(num_matches):
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
+        games = [Board(player_1, player_2) for player_1, player_2 in pairs]
 
         # initialize all games with a random move and response
+        opening = []
         for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
+            move = rng.choice(games[0].get_legal_moves())
+            opening.append(move)
             for game in games:
                 game.apply_move(move)
 
+        seeds = [rng.getrandbits(32) for _ in pairs]
+        if executor is not None:
+            tasks.extend((player_1, player_2, opening, seed)
+                         for (player_1, player_2), seed in zip(pairs, seeds))
+            continue
+
         # play all games and tally the results
-        for game in games:
+        for game, seed in zip(games, seeds):
+            random.seed(seed)
             winner, _, termination = game.play(time_limit=TIME_LIMIT)
             win_counts[winner] += 1
 
@@ -68,6 +116,20 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
             elif termination == "forfeit":
                 forfeit_count += 1
 
+    if executor is not None:
+        for task, (winner_idx, termination, records) in zip(tasks, executor.map(play_game, tasks)):
+            win_counts[task[winner_idx]] += 1
+
+            # the players in the worker were copies; bring their stats back
+            for player, player_records in zip(task, records):
+                if player_records is not None:
+                    player.stats.merge(player_records)
+
+            if termination == "timeout":
+                timeout_count += 1
+            elif termination == "forfeit":
+                forfeit_count += 1
+
     return timeout_count, forfeit_count
 
 
@@ -77,8 +139,27 @@ def update(total_wins, wins):
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, workers=1, seed=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    With more than one worker the games are played in a pool of that many
+    processes. The pool is never larger than the number of CPUs, so that no
+    game has to share a core and the time limit means the same as in a
+    serial run. With a seed the openings and the seed of every game are the
+    same whatever the number of workers.
+
+    Returns the wins of each test agent and the numbers of timeouts and
+    forfeits.
+    """
+    workers = min(workers, os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return _play_matches(cpu_agents, test_agents, num_matches, executor, seed)
+    return _play_matches(cpu_agents, test_agents, num_matches, seed=seed)
+
+
+def _play_matches(cpu_agents, test_agents, num_matches, executor=None, seed=None):
+    rng = random.Random(seed)
     total_wins = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
@@ -93,7 +174,7 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        counts = play_round(agent, test_agents, wins, num_matches, executor, rng)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
@@ -123,16 +204,66 @@ def play_matches(cpu_agents, test_agents, num_matches):
         print(("\nYour ID search forfeited {} games while there were still " +
                "legal moves available to play.\n").format(total_forfeits))
 
+    print_stats(test_agents)
+    return total_wins, total_timeouts, total_forfeits
 
-def main():
+
+def print_stats(agents):
+    """Print the search statistics collected by the agents that carry a
+    `SearchStats` collector, aggregated over the whole tournament.
+    """
+    agents = [agent for agent in agents if getattr(agent.player, "stats", None) is not None]
+    if not agents:
+        return
+
+    summaries = [(agent.name, summarize_moves(agent.player.stats.moves)) for agent in agents]
+    print("\n{:^74}".format("Search statistics"))
+    print("{:<13}{:>7}{:>7}{:>10}{:>10}{:>9}{:>9}{:>9}".format(
+        "Agent", "Moves", "Depth", "Nodes/s", "Cutoffs", "Evals", "Cache", "Min ms"))
+    for name, summary in summaries:
+        margin = summary["min_time_left"]
+        print("{:<13}{:>7}{:>7.2f}{:>10.0f}{:>10}{:>9}{:>8.0f}%{:>9}".format(
+            name, summary["moves"], summary["mean_depth"], summary["nodes_per_sec"],
+            summary["cutoffs"], summary["evaluations"], 100 * summary["cache_hit_rate"],
+            "-" if margin is None else "{:.1f}".format(margin)))
+
+    print("\nSearch time (s) by iteration depth")
+    depths = sorted(set(depth for _, summary in summaries for depth in summary["depth_seconds"]))
+    print("{:<13}".format("Agent") + "".join("{:>7}".format(depth) for depth in depths))
+    for name, summary in summaries:
+        print("{:<13}".format(name) + "".join(
+            "{:>7.2f}".format(summary["depth_seconds"].get(depth, 0.)) for depth in depths))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes playing games in parallel; "
+                             "each one plays a single game at a time "
+                             "(default: 1, at most {})".format(os.cpu_count()))
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the openings and for every game")
+    parser.add_argument("--stats", action="store_true",
+                        help="collect and print the search statistics of the test agents")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
+    stats = SearchStats if args.stats else lambda: None
     test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=improved_score, stats=stats()), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, stats=stats()), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, stats=stats()), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, stats=stats()), "AB_Custom_3"),
+        Agent(PVSPlayer(score_fn=custom_score, stats=stats()), "PVS_Custom"),
+        Agent(CustomPlayer(timeout=10.), "MCTS")
     ]
 
     # Define a collection of agents to compete against the test agents
@@ -150,7 +281,7 @@ def main():
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    play_matches(cpu_agents, test_agents, NUM_MATCHES, args.workers, args.seed)
 
 
 if __name__ == "__main__":